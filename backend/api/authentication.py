@@ -0,0 +1,88 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from .checks import is_shared_cache_required
+from .metrics import count_cache
+
+TOKEN_PREFIX = 'auth-token:'
+# В кэш попадают только эти поля пользователя, без пароля.
+# Остальные загрузятся из базы при первом обращении к ним.
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'role',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def get_cache():
+    return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+
+
+def get_token_cache_key(key):
+    # В ключе кэша хранится хэш, а не сам токен.
+    return TOKEN_PREFIX + sha256(key.encode()).hexdigest()
+
+
+def invalidate_tokens(*keys):
+    get_cache().delete_many([get_token_cache_key(key) for key in keys])
+
+
+def invalidate_user_tokens(user_id):
+    invalidate_tokens(*Token.objects.filter(user_id=user_id).values_list(
+        'key', flat=True
+    ))
+
+
+def get_cached_user(values):
+    """Пользователь с отложенными полями из закэшированных значений.
+
+    save() у такого экземпляра запишет только загруженные поля,
+    пароль и счетчики читаются из базы по требованию.
+    """
+    # from_db ждет значения в порядке полей модели.
+    fields = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in values
+    ]
+    return User.from_db(
+        router.db_for_read(User), fields, [values[name] for name in fields]
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который держит поля пользователя в кэше.
+
+    Запись живет AUTH_TOKEN_CACHE_TIMEOUT секунд и сбрасывается
+    сигналами при удалении токена (logout) и любом сохранении
+    пользователя, включая смену пароля. Сброс виден всем воркерам
+    только в общем кэше, поэтому с локальным кэшем процесса токен
+    каждый раз проверяется по базе (см. api.checks).
+    """
+
+    def authenticate_credentials(self, key):
+        if is_shared_cache_required(settings.AUTH_TOKEN_CACHE_ALIAS):
+            return super().authenticate_credentials(key)
+        cache = get_cache()
+        cache_key = get_token_cache_key(key)
+        values = cache.get(cache_key)
+        count_cache('auth_tokens', values is not None)
+        if values is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(
+                cache_key,
+                {field: getattr(user, field) for field in CACHED_USER_FIELDS},
+                settings.AUTH_TOKEN_CACHE_TIMEOUT
+            )
+            return user, token
+        user = get_cached_user(values)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return user, Token(key=key, user=user)
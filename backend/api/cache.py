@@ -0,0 +1,89 @@
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import urlencode
+
+GENERATION_PREFIX = 'recipes-cache:generation:'
+STATS_PREFIX = 'recipes-cache:stats:'
+RESPONSE_PREFIX = 'recipes-cache:response:'
+LIST_GENERATIONS = ('list', 'tag', 'ingredient', 'user',)
+DETAIL_GENERATIONS = ('tag', 'ingredient', 'user',)
+
+
+def get_cache():
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def recipe_generation(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def get_generations(names):
+    """Текущие поколения; отсутствующие заводятся заново.
+
+    Новое поколение берется от текущего времени, чтобы после вытеснения
+    ключа из кэша не вернуться к уже использованному значению.
+    """
+    cache = get_cache()
+    keys = [GENERATION_PREFIX + name for name in names]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return tuple(generations[key] for key in keys)
+
+
+def bump_generations(*names):
+    cache = get_cache()
+    for name in names:
+        key = GENERATION_PREFIX + name
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def bump_generations_on_commit(*names):
+    """Сдвигает поколения после коммита текущей транзакции.
+
+    Иначе параллельный запрос успеет закэшировать под новым
+    поколением еще не закоммиченные, то есть старые данные.
+    """
+    transaction.on_commit(lambda: bump_generations(*names))
+
+
+def count(name):
+    cache = get_cache()
+    key = STATS_PREFIX + name
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_stats():
+    cache = get_cache()
+    stats = cache.get_many([STATS_PREFIX + 'hits', STATS_PREFIX + 'misses'])
+    hits = stats.get(STATS_PREFIX + 'hits', 0)
+    misses = stats.get(STATS_PREFIX + 'misses', 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else None,
+    }
+
+
+def get_response_key(request, action, generations, pk=None):
+    query = urlencode(sorted(
+        (key, sorted(values)) for key, values in request.query_params.lists()
+    ), doseq=True)
+    digest = md5(
+        f'{request.get_host()}?{query}|{generations}'.encode()
+    ).hexdigest()
+    return f'{RESPONSE_PREFIX}{action}:{pk}:{digest}'
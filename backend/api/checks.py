@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Бэкенды, у которых в каждом воркере gunicorn свой экземпляр кэша.
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+# DummyCache ничего не хранит: это явное отключение кэша.
+DUMMY_CACHE = 'django.core.cache.backends.dummy.DummyCache'
+# Бэкенды, общие для всех воркеров, с атомарным incr на сервере.
+ATOMIC_INCR_CACHES = (
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.memcached.MemcachedCache',
+    'django.core.cache.backends.redis.RedisCache',
+    'django_redis.cache.RedisCache',
+)
+
+
+def is_process_local(alias):
+    return settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_CACHES
+
+
+def is_shared_cache_required(alias):
+    """Общий кэш нужен везде, кроме отладки в одном процессе."""
+    return not settings.DEBUG and is_process_local(alias)
+
+
+# Проверки окружения: запускаются manage.py check --deploy и не мешают
+# локальной работе с кэшем по умолчанию.
+@register(Tags.caches, deploy=True)
+def check_token_cache(app_configs, **kwargs):
+    alias = settings.AUTH_TOKEN_CACHE_ALIAS
+    if not is_shared_cache_required(alias):
+        return []
+    return [Warning(
+        f'AUTH_TOKEN_CACHE_ALIAS "{alias}" uses a process-local cache '
+        'backend, so token caching is disabled.',
+        hint='Point the alias at memcached or another shared backend, '
+             'otherwise a revoked token keeps working in other workers.',
+        id='api.W001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_throttle_cache(app_configs, **kwargs):
+    alias = settings.THROTTLE_CACHE_ALIAS
+    backend = settings.CACHES[alias]['BACKEND']
+    if backend in ATOMIC_INCR_CACHES or backend == DUMMY_CACHE:
+        return []
+    return [Error(
+        f'THROTTLE_CACHE_ALIAS "{alias}" has no shared atomic incr: '
+        'every worker would count its own window.',
+        hint='Set CACHE_BACKEND to '
+             'django.core.cache.backends.memcached.PyMemcacheCache '
+             'and CACHE_LOCATION to the memcached address.',
+        id='api.E001',
+    )]
@@ -1,5 +1,9 @@
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import Ingredient, Recipe
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .search import search_recipes
 
 
 class IngredientSearchFilter(FilterSet):
@@ -30,3 +34,14 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(cart__user=self.request.user)
         return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по названию и описанию рецепта."""
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_recipes(queryset, query)
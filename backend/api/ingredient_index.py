@@ -0,0 +1,75 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+from recipes.models import ChangeVersion, Ingredient
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса.
+
+    Строится при первом запросе. Перед каждым поиском сверяется
+    с версией таблицы ingredient в базе и перестраивается, если
+    ее изменил любой воркер.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+
+    def build(self):
+        rows = sorted(
+            (normalize(name), id, name, measurement_unit)
+            for id, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        keys = [row[0] for row in rows]
+        entries = [
+            {'id': id, 'name': name, 'measurement_unit': measurement_unit}
+            for _, id, name, measurement_unit in rows
+        ]
+        offsets = []
+        offset = 0
+        for key in keys:
+            offsets.append(offset)
+            offset += len(key) + 1
+        return keys, entries, offsets, '\n'.join(keys)
+
+    def get(self):
+        version = ChangeVersion.get_version('ingredient')
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    # Версия читается до строк: изменение, попавшее
+                    # между ними, вызовет еще одну перестройку.
+                    self._index = self.build()
+                    self._version = version
+        return self._index
+
+    def search(self, query):
+        """Сначала ингредиенты, начинающиеся с query, затем содержащие его."""
+        keys, entries, offsets, haystack = self.get()
+        query = normalize(query)
+        if not query:
+            return list(entries)
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + '\uffff', start)
+        contains = []
+        position = haystack.find(query)
+        while position != -1:
+            row = bisect_right(offsets, position) - 1
+            if position != offsets[row]:
+                contains.append(entries[row])
+            next_row = row + 1
+            if next_row == len(offsets):
+                break
+            position = haystack.find(query, offsets[next_row])
+        return entries[start:end] + contains
+
+
+ingredient_index = IngredientIndex()
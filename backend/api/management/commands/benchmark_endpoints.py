@@ -0,0 +1,280 @@
+import base64
+import json
+import math
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from typing import Any, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from api.management.commands.compare_projections import DUMMY_CACHES
+
+
+def percentile(values, percent):
+    """Процентиль методом ближайшего ранга."""
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def get_image():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 40)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks the main API endpoints through the URLconf: '
+            'latency percentiles, queries and allocated memory per request, '
+            'optionally compared with a saved baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='How many times each endpoint is timed.'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=3,
+            help='Untimed requests before measuring each endpoint.'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Id of the user to request as, by default the first one '
+                 'with a cart and subscriptions.'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            metavar='FILE',
+            help='Write the results as JSON to FILE.'
+        )
+        parser.add_argument(
+            '--baseline',
+            metavar='FILE',
+            help='Fail if any endpoint is worse than in this JSON file.'
+        )
+        parser.add_argument(
+            '--latency-budget',
+            type=float,
+            default=0.25,
+            help='Allowed relative growth of p95 over the baseline.'
+        )
+        parser.add_argument(
+            '--latency-floor',
+            type=float,
+            default=5.0,
+            help='p95 growth in ms that is never a regression (noise).'
+        )
+        parser.add_argument(
+            '--query-budget',
+            type=int,
+            default=0,
+            help='Allowed extra queries per request over the baseline.'
+        )
+        parser.add_argument(
+            '--memory-budget',
+            type=float,
+            default=0.5,
+            help='Allowed relative growth of peak allocated memory.'
+        )
+
+    def get_user(self, pk):
+        users = User.objects.order_by('id')
+        if pk:
+            return users.get(pk=pk)
+        user = (users.filter(user_cart__isnull=False,
+                             follower__isnull=False).first()
+                or users.first())
+        if user is None:
+            raise CommandError(
+                'No users, run generate_load_data first.')
+        return user
+
+    def get_cases(self, user):
+        """Имя, клиент и запросы одной итерации для каждого эндпоинта."""
+        recipe = Recipe.objects.order_by('-favorites_count', '-id').first()
+        tag = Tag.objects.first()
+        ingredients = list(Ingredient.objects.values_list('id', flat=True)[:5])
+        if recipe is None or tag is None or not ingredients:
+            raise CommandError(
+                'Not enough data, run generate_load_data first.')
+        free = Recipe.objects.exclude(favorites__user=user).exclude(
+            cart__user=user).values_list('id', flat=True).first()
+        word = recipe.name.split()[0]
+        prefix = Ingredient.objects.values_list('name', flat=True).first()[:3]
+        payload = {
+            'ingredients': [
+                {'id': pk, 'amount': amount}
+                for amount, pk in enumerate(ingredients, 1)
+            ],
+            'tags': [tag.id],
+            'image': get_image(),
+            'name': 'Тестовый рецепт',
+            'text': 'Описание тестового рецепта.',
+            'cooking_time': 10,
+        }
+        own = self.request(self.user_client, 'post', '/api/recipes/', payload)
+        own = json.loads(own)['id']
+        patches = [
+            {'cooking_time': 20, 'ingredients': payload['ingredients'][:3]},
+            {'cooking_time': 10, 'ingredients': payload['ingredients']},
+        ]
+        return [
+            ('recipes list (anon)', self.anon_client,
+             [('get', '/api/recipes/', None)]),
+            ('recipes list', self.user_client,
+             [('get', '/api/recipes/', None)]),
+            ('recipes ?tags', self.user_client,
+             [('get', f'/api/recipes/?tags={tag.slug}', None)]),
+            ('recipes ?author', self.user_client,
+             [('get', f'/api/recipes/?author={recipe.author_id}', None)]),
+            ('recipes ?is_favorited', self.user_client,
+             [('get', '/api/recipes/?is_favorited=1', None)]),
+            ('recipes ?is_in_shopping_cart', self.user_client,
+             [('get', '/api/recipes/?is_in_shopping_cart=1', None)]),
+            ('recipes ?search', self.user_client,
+             [('get', f'/api/recipes/?search={word}', None)]),
+            ('recipe detail', self.user_client,
+             [('get', f'/api/recipes/{recipe.id}/', None)]),
+            ('recipe create', self.user_client,
+             [('post', '/api/recipes/', payload)]),
+            ('recipe patch x2', self.user_client,
+             [('patch', f'/api/recipes/{own}/', patch) for patch in patches]),
+            ('favorite toggle', self.user_client,
+             [(method, f'/api/recipes/{free}/favorite/', None)
+              for method in ('post', 'delete')]),
+            ('cart toggle', self.user_client,
+             [(method, f'/api/recipes/{free}/shopping_cart/', None)
+              for method in ('post', 'delete')]),
+            ('subscriptions', self.user_client,
+             [('get', '/api/users/subscriptions/?recipes_limit=3', None)]),
+            ('users list', self.user_client,
+             [('get', '/api/users/', None)]),
+            ('ingredient search', self.user_client,
+             [('get', f'/api/ingredients/?name={prefix}', None)]),
+            ('download cart', self.user_client,
+             [('get', '/api/recipes/download_shopping_cart/', None)]),
+        ]
+
+    def request(self, client, method, url, data):
+        if data is None:
+            response = getattr(client, method)(url)
+        else:
+            response = getattr(client, method)(
+                url, json.dumps(data), content_type='application/json'
+            )
+        if response.streaming:
+            body = b''.join(response.streaming_content)
+        else:
+            body = response.content
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{method.upper()} {url}: {response.status_code} {body[:200]}'
+            )
+        return body
+
+    def run_steps(self, client, steps):
+        for method, url, data in steps:
+            self.request(client, method, url, data)
+
+    def measure(self, client, steps, options):
+        for _ in range(options['warmup']):
+            self.run_steps(client, steps)
+        timings, queries = [], 0
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self.run_steps(client, steps)
+                timings.append(time.perf_counter() - started)
+            queries = max(queries, len(captured))
+        # tracemalloc замедляет код, поэтому память меряется отдельно.
+        tracemalloc.start()
+        self.run_steps(client, steps)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            'requests': len(steps),
+            'p50_ms': round(percentile(timings, 50) * 1000, 2),
+            'p95_ms': round(percentile(timings, 95) * 1000, 2),
+            'p99_ms': round(percentile(timings, 99) * 1000, 2),
+            'queries': queries,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def get_regressions(self, result, baseline, options):
+        problems = []
+        if result['queries'] > baseline['queries'] + options['query_budget']:
+            problems.append(
+                f'queries {baseline["queries"]} -> {result["queries"]}')
+        grown = result['p95_ms'] - baseline['p95_ms']
+        if (result['p95_ms'] > baseline['p95_ms'] * (
+                1 + options['latency_budget'])
+                and grown > options['latency_floor']):
+            problems.append(
+                f'p95 {baseline["p95_ms"]} -> {result["p95_ms"]} ms')
+        if result['peak_kb'] > baseline['peak_kb'] * (
+                1 + options['memory_budget']):
+            problems.append(
+                f'memory {baseline["peak_kb"]} -> {result["peak_kb"]} KiB')
+        return problems
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['endpoints']
+        results = {}
+        regressed = 0
+        # Кэши отключены, чтобы мерить саму работу, а не попадания;
+        # все изменения откатываются, картинки пишутся во временный каталог.
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            CACHES=DUMMY_CACHES, MEDIA_ROOT=media_root
+        ), transaction.atomic():
+            user = self.get_user(options['user'])
+            token, _ = Token.objects.get_or_create(user=user)
+            self.anon_client = Client()
+            self.user_client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+            for name, client, steps in self.get_cases(user):
+                result = results[name] = self.measure(client, steps, options)
+                line = (
+                    f'{name:30} p50 {result["p50_ms"]:8.2f}  '
+                    f'p95 {result["p95_ms"]:8.2f}  '
+                    f'p99 {result["p99_ms"]:8.2f} ms  '
+                    f'{result["queries"]:4} queries  '
+                    f'{result["peak_kb"]:9.1f} KiB'
+                )
+                problems = (
+                    self.get_regressions(result, baseline[name], options)
+                    if name in baseline else []
+                )
+                if problems:
+                    regressed += 1
+                    self.stdout.write(self.style.ERROR(
+                        f'{line}  {"; ".join(problems)}'))
+                else:
+                    self.stdout.write(line)
+            transaction.set_rollback(True)
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'repeat': options['repeat'],
+                    'user': user.id,
+                    'endpoints': results,
+                }, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Baseline saved to {options["save_baseline"]}')
+        if regressed:
+            raise CommandError(f'{regressed} endpoints regressed.')
+        self.stdout.write(self.style.SUCCESS('No regressions'))
@@ -0,0 +1,66 @@
+import timeit
+from typing import Any, Optional
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from recipes.models import Ingredient
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import ORJSONRenderer
+from api.serializers import IngredientSerializer, RecipeListRetrieveSerializer
+from api.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    help = ('Compares the stdlib JSON renderer with ORJSONRenderer on the '
+            'full ingredient list and a page of recipes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100,
+            help='Size of the recipe page to render.'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='How many times each payload is rendered.'
+        )
+
+    def get_payloads(self, recipes_count):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        view = RecipeViewSet(request=request, action='list',
+                             format_kwarg=None, kwargs={})
+        recipes = view.get_queryset()[:recipes_count]
+        return {
+            'ingredients': IngredientSerializer(
+                Ingredient.objects.all(), many=True).data,
+            f'recipes x{len(recipes)}': RecipeListRetrieveSerializer(
+                recipes, many=True, context={'request': request}).data,
+        }
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        repeat = options['repeat']
+        renderers = (JSONRenderer(), ORJSONRenderer())
+        for name, data in self.get_payloads(options['recipes']).items():
+            timings = []
+            for renderer in renderers:
+                seconds = min(timeit.repeat(
+                    lambda: renderer.render(data), number=1, repeat=repeat
+                ))
+                timings.append(seconds)
+                self.stdout.write(
+                    f'{name:16} {type(renderer).__name__:14} '
+                    f'{seconds * 1000:8.2f} ms '
+                    f'{len(renderer.render(data)):9} bytes'
+                )
+            saved = timings[0] - timings[1]
+            self.stdout.write(self.style.SUCCESS(
+                f'{name:16} saved {saved * 1000:.2f} ms per render '
+                f'({timings[0] / timings[1]:.1f}x)'
+            ))
@@ -0,0 +1,116 @@
+import time
+from typing import Any, Optional
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from recipes.models import Recipe
+from rest_framework.test import APIRequestFactory, force_authenticate
+from users.models import User
+
+from api.views import CustomUserViewSet, RecipeViewSet, SubscriptionViewSet
+
+DUMMY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    help = ('Checks that read projections render the same bytes as the '
+            'serializers and compares their throughput.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='How many times each request is timed on each path.'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Id of the user to request as, by default the first one '
+                 'with subscriptions.'
+        )
+
+    def get_cases(self, user):
+        recipe = Recipe.objects.values_list('id', flat=True).first()
+        recipes = {'get': 'list'}
+        cases = [
+            (RecipeViewSet, recipes, '/api/recipes/?limit=100', {}),
+            (RecipeViewSet, recipes, '/api/recipes/?page=2', {}),
+            (RecipeViewSet, recipes, '/api/recipes/?cursor=', {}),
+            (CustomUserViewSet, {'get': 'list'}, '/api/users/?limit=100', {}),
+            (CustomUserViewSet, {'get': 'retrieve'},
+             f'/api/users/{user.id}/', {'id': user.id}),
+        ]
+        if recipe is not None:
+            cases.append((RecipeViewSet, {'get': 'retrieve'},
+                          f'/api/recipes/{recipe}/', {'pk': recipe}))
+        return [(case, AnonymousUser()) for case in cases] + [
+            (case, user) for case in cases
+        ] + [
+            ((RecipeViewSet, recipes, '/api/recipes/?is_favorited=1', {}),
+             user),
+            ((SubscriptionViewSet, {'get': 'list'},
+              '/api/users/subscriptions/?recipes_limit=3', {}), user),
+            ((SubscriptionViewSet, {'get': 'list'},
+              '/api/users/subscriptions/?limit=100', {}), user),
+        ]
+
+    def render(self, view, url, kwargs, user):
+        request = APIRequestFactory().get(url)
+        if user.is_authenticated:
+            force_authenticate(request, user=user)
+        response = view(request, **kwargs)
+        return response.status_code, response.render().content
+
+    def measure(self, view, url, kwargs, user, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            self.render(view, url, kwargs, user)
+        return (time.perf_counter() - started) / repeat
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        users = User.objects.order_by('id')
+        if options['user']:
+            user = users.get(pk=options['user'])
+        else:
+            user = (users.filter(follower__isnull=False).first()
+                    or users.first())
+        if user is None:
+            raise CommandError('No users to request as.')
+        mismatches = 0
+        with override_settings(CACHES=DUMMY_CACHES):
+            for (viewset, actions, url, kwargs), as_user in self.get_cases(
+                user
+            ):
+                paths = [
+                    viewset.as_view(actions, projection_class=None),
+                    viewset.as_view(actions),
+                ]
+                results = [
+                    self.render(view, url, kwargs, as_user) for view in paths
+                ]
+                timings = [
+                    self.measure(view, url, kwargs, as_user,
+                                 options['repeat'])
+                    for view in paths
+                ]
+                who = 'user' if as_user.is_authenticated else 'anon'
+                line = (
+                    f'{who:4} {url:45} {results[1][0]} '
+                    f'serializer {1 / timings[0]:8.1f} req/s  '
+                    f'projection {1 / timings[1]:8.1f} req/s  '
+                    f'({timings[0] / timings[1]:.1f}x)'
+                )
+                if results[0] == results[1]:
+                    self.stdout.write(line)
+                else:
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(f'{line}  DIFFERS'))
+        if mismatches:
+            raise CommandError(
+                f'{mismatches} responses differ from the serializers.')
+        self.stdout.write(self.style.SUCCESS(
+            'Projections match the serializers byte for byte'))
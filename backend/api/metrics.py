@@ -0,0 +1,80 @@
+"""Метрики Prometheus для /api/metrics/.
+
+Под gunicorn каждый воркер пишет значения в файлы каталога
+PROMETHEUS_MULTIPROC_DIR (его готовит gunicorn.conf.py), при выдаче
+они суммируются по всем воркерам.
+"""
+import os
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+METHODS = ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса.',
+    ('view', 'method', 'status'),
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_db_queries',
+    'Число запросов к базе за один запрос.',
+    ('view',),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Размер тела ответа.',
+    ('view',),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+THROTTLED_REQUESTS = Counter(
+    'foodgram_throttled_requests_total',
+    'Запросы, отклоненные троттлингом.',
+    ('scope',),
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кэшам приложения.',
+    ('cache', 'result'),
+)
+
+
+def get_view_name(view_func, method):
+    """Метка вида RecipeViewSet.list или SubscriptionBulkAPIView.post."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method.lower(), method.lower())}'
+
+
+def observe_request(view, method, status, duration, queries=None,
+                    size=None):
+    if method not in METHODS:
+        method = 'other'
+    REQUEST_LATENCY.labels(view, method, f'{status // 100}xx').observe(
+        duration
+    )
+    if queries is not None:
+        REQUEST_QUERIES.labels(view).observe(queries)
+    if size is not None:
+        RESPONSE_SIZE.labels(view).observe(size)
+
+
+def count_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,182 @@
+import json
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import get_view_name, observe_request
+
+slow_request_logger = logging.getLogger('api.slow_requests')
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_PLACEHOLDER_LISTS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+SQL_SPACES = re.compile(r'\s+')
+
+
+def get_sql_fingerprint(sql):
+    """Запрос без литералов: одинаковые запросы с разными id совпадают."""
+    sql = SQL_LITERALS.sub('%s', sql)
+    sql = SQL_PLACEHOLDER_LISTS.sub('(...)', sql)
+    return SQL_SPACES.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper: считает запросы, их время и отпечатки SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.durations = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - started
+            fingerprint = get_sql_fingerprint(sql)
+            self.count += 1
+            self.duration += elapsed
+            self.fingerprints[fingerprint] += 1
+            self.durations[fingerprint] += elapsed
+
+    def get_repeated(self, limit):
+        return [
+            {
+                'sql': fingerprint,
+                'count': count,
+                'ms': round(self.durations[fingerprint] * 1000, 2),
+            }
+            for fingerprint, count in self.fingerprints.most_common(limit)
+            if count > 1
+        ]
+
+
+class RequestTimingMiddleware:
+    """Server-Timing и журнал медленных запросов.
+
+    Время делится на db - запросы к базе, view - код представления
+    без базы (для API это в основном сериализация) и render -
+    отрисовка ответа рендерером DRF.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = perf_counter()
+        queries = request.query_recorder = QueryRecorder()
+        request.timing_marks = {}
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        total = perf_counter() - started
+        timings = self.get_timings(request, total)
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            for name, duration in timings.items()
+        )
+        if total * 1000 >= settings.SLOW_REQUEST_THRESHOLD:
+            self.log_slow_request(request, response, timings)
+        return response
+
+    def mark(self, request, name):
+        request.timing_marks[name] = (
+            perf_counter(), request.query_recorder.duration
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.mark(request, 'view')
+
+    def process_template_response(self, request, response):
+        # Вызывается прямо перед response.render().
+        self.mark(request, 'render')
+        response.add_post_render_callback(
+            lambda response: self.mark(request, 'rendered')
+        )
+        return response
+
+    def get_timings(self, request, total):
+        timings = {'db': request.query_recorder.duration}
+        marks = request.timing_marks
+        for name, start, end in (
+            ('view', 'view', 'render'), ('render', 'render', 'rendered')
+        ):
+            if start in marks and end in marks:
+                # Время между отметками без запросов к базе внутри него.
+                timings[name] = (
+                    marks[end][0] - marks[start][0]
+                    - (marks[end][1] - marks[start][1])
+                )
+        timings['total'] = total
+        return timings
+
+    def log_slow_request(self, request, response, timings):
+        record = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user': getattr(request.user, 'pk', None)
+            if hasattr(request, 'user') else None,
+            'queries': request.query_recorder.count,
+            **{
+                f'{name}_ms': round(duration * 1000, 2)
+                for name, duration in timings.items()
+            },
+            'repeated_sql': request.query_recorder.get_repeated(
+                settings.SLOW_REQUEST_TOP_SQL
+            ),
+        }
+        slow_request_logger.warning(
+            json.dumps(record, ensure_ascii=False), extra={'request': request}
+        )
+
+
+class MetricsMiddleware:
+    """Пишет в Prometheus время, число запросов к базе и размер ответа.
+
+    Число запросов берется у RequestTimingMiddleware, если он включен
+    раньше в MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = perf_counter()
+        response = self.get_response(request)
+        queries = getattr(request, 'query_recorder', None)
+        observe_request(
+            getattr(request, 'metrics_view', 'unmatched'),
+            request.method,
+            response.status_code,
+            perf_counter() - started,
+            queries.count if queries is not None else None,
+            None if response.streaming else len(response.content),
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = get_view_name(view_func, request.method)
+
+
+class RateLimitHeadersMiddleware:
+    """Сообщает клиенту остаток квоты, посчитанный троттлингом API."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        quota = getattr(request, 'rate_limit', None)
+        if quota is not None:
+            response['X-RateLimit-Limit'] = quota['limit']
+            response['X-RateLimit-Remaining'] = quota['remaining']
+            response['X-RateLimit-Reset'] = quota['reset']
+        return response
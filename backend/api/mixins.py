@@ -1,4 +1,17 @@
+from calendar import timegm
+from hashlib import md5
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from recipes.models import ChangeVersion
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+
+from . import cache
+from .metrics import count_cache
 
 
 class ListViewSet(mixins.ListModelMixin,
@@ -10,3 +23,159 @@ class ListRetrieveViewSet(mixins.ListModelMixin,
                           mixins.RetrieveModelMixin,
                           viewsets.GenericViewSet):
     pass
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 на If-None-Match/If-Modified-Since до сериализации.
+
+    Валидаторы собираются из версий таблиц change_versions и из
+    get_validator_state, куда вьюсет добавляет свои части ключа.
+    """
+    change_versions = ()
+
+    def get_change_versions(self):
+        return self.change_versions
+
+    def get_validator_state(self):
+        """Возвращает (части ключа, дата изменения) или None,
+        если валидаторы посчитать нельзя."""
+        return (), None
+
+    def get_validators(self):
+        state = self.get_validator_state()
+        if state is None:
+            return None, None
+        parts, modified = state
+        versions = sorted(ChangeVersion.objects.filter(
+            name__in=self.get_change_versions()
+        ).values_list('name', 'version', 'modified'))
+        dates = [date for _, _, date in versions]
+        if modified is not None:
+            dates.append(modified)
+        etag = quote_etag(md5(
+            repr(([name_version[:2] for name_version in versions], parts,
+                  modified)).encode()
+        ).hexdigest())
+        last_modified = timegm(max(dates).timetuple()) if dates else None
+        return etag, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class AnonymousCacheMixin:
+    """Кэширует данные ответов list/retrieve для анонимных пользователей.
+
+    Ключ содержит нормализованную строку запроса и поколения данных,
+    сигналы увеличивают поколения при изменении рецептов и каталогов.
+    """
+
+    def cached_response(self, handler, generations, object_id, request,
+                        *args, **kwargs):
+        if not request.user.is_anonymous:
+            return handler(request, *args, **kwargs)
+        key = cache.get_response_key(
+            request, self.action, cache.get_generations(generations),
+            object_id
+        )
+        data = cache.get_cache().get(key)
+        if data is not None:
+            cache.count('hits')
+            count_cache('recipes', True)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        cache.count('misses')
+        count_cache('recipes', False)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.get_cache().set(
+                key, response.data, settings.RECIPE_CACHE_TIMEOUT
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().list, cache.LIST_GENERATIONS, None, request, *args,
+            **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        # Сигналы сдвигают поколение recipe:<id> по числовому id, так что
+        # /recipes/01/ должен попасть в тот же ключ, что и /recipes/1/.
+        try:
+            object_id = int(kwargs.get(self.lookup_field))
+        except (TypeError, ValueError):
+            return super().retrieve(request, *args, **kwargs)
+        generations = (
+            cache.recipe_generation(object_id), *cache.DETAIL_GENERATIONS
+        )
+        return self.cached_response(
+            super().retrieve, generations, object_id, request, *args,
+            **kwargs
+        )
+
+
+class ProjectionMixin:
+    """list и retrieve отдают данные через projection_class.
+
+    Сериализатор не используется, поэтому миксин подходит только для
+    чтения без объектных прав. Если projection_class не задан,
+    работает обычный путь через сериализатор.
+    """
+    projection_class = None
+
+    def get_projection(self):
+        return self.projection_class(self.request)
+
+    def list(self, request, *args, **kwargs):
+        if self.projection_class is None:
+            return super().list(request, *args, **kwargs)
+        projection = self.get_projection()
+        rows = projection.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.represent(page))
+        return Response(projection.represent(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.projection_class is None:
+            return super().retrieve(request, *args, **kwargs)
+        projection = self.get_projection()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            rows = projection.represent(projection.get_rows(
+                self.filter_queryset(self.get_queryset()).filter(
+                    **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+                )
+            ))
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if not rows:
+            raise Http404
+        return Response(rows[0])
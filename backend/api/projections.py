@@ -0,0 +1,182 @@
+from collections import defaultdict
+from operator import itemgetter
+
+from django.db.models import Exists, OuterRef, Value
+from recipes.images import IMAGE_VARIANTS
+from recipes.models import AddAmount, Recipe, Tag
+from users.models import Subscription, User
+
+from .serializers import (AddAmountSerializer, CustomUserSerializer,
+                          PartialRecipeSerializer,
+                          RecipeListRetrieveSerializer,
+                          SubscriptionListSerializer, TagSerializer)
+from .utils import get_recipes_by_author
+
+RECIPE_IMAGE_COLUMNS = (
+    'image', *(f'image_{name}' for name in IMAGE_VARIANTS)
+)
+
+
+class Projection:
+    """Собирает ответ чтения из values()-строк, минуя поля сериализатора.
+
+    Состав и порядок ключей берутся из Meta.fields serializer_class.
+    Для каждого поля один раз выбирается функция: project_<поле>(row),
+    если она есть, иначе чтение колонки columns.get(поле, поле).
+    Вывод должен совпадать с serializer_class байт в байт, это
+    проверяет команда compare_projections.
+    """
+    serializer_class = None
+    columns = {}
+
+    def __init__(self, request):
+        self.request = request
+        self.fields = self.serializer_class.Meta.fields
+        self.getters = tuple(
+            getattr(self, f'project_{name}', None)
+            or itemgetter(self.columns.get(name, name))
+            for name in self.fields
+        )
+
+    def get_columns(self):
+        return tuple(
+            self.columns.get(name, name) for name in self.fields
+            if not hasattr(self, f'project_{name}')
+        )
+
+    def get_rows(self, queryset):
+        return queryset.prefetch_related(None).values(*self.get_columns())
+
+    def load(self, rows):
+        """Пачкой догружает связанные данные для строк страницы."""
+
+    def represent(self, rows):
+        rows = list(rows)
+        self.load(rows)
+        fields, getters = self.fields, self.getters
+        return [
+            {name: getter(row) for name, getter in zip(fields, getters)}
+            for row in rows
+        ]
+
+    def build_url(self, name):
+        """Как serializers.ImageField: абсолютная ссылка или None."""
+        if not name:
+            return None
+        url = Recipe.image.field.storage.url(name)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+
+class UserProjection(Projection):
+    serializer_class = CustomUserSerializer
+
+    def annotate_is_subscribed(self, queryset, author='pk'):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(is_subscribed=Value(False))
+        return queryset.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef(author))
+        ))
+
+    def get_rows(self, queryset):
+        return super().get_rows(self.annotate_is_subscribed(queryset))
+
+
+class PartialRecipeProjection(Projection):
+    serializer_class = PartialRecipeSerializer
+
+    def get_columns(self):
+        return (*super().get_columns(), *RECIPE_IMAGE_COLUMNS)
+
+    def project_image(self, row):
+        return self.build_url(row['image'])
+
+    def project_image_variants(self, row):
+        if not row['image']:
+            return None
+        return {
+            name: self.build_url(row[f'image_{name}'] or row['image'])
+            for name in IMAGE_VARIANTS
+        }
+
+
+class RecipeProjection(PartialRecipeProjection):
+    serializer_class = RecipeListRetrieveSerializer
+
+    def get_columns(self):
+        # pub_date нужен курсорной пагинации.
+        return (*super().get_columns(), 'author', 'pub_date')
+
+    def load(self, rows):
+        ids = [row['id'] for row in rows]
+        self.tags = defaultdict(list)
+        tag_fields = TagSerializer.Meta.fields
+        for recipe, *tag in Tag.objects.filter(recipes__in=ids).values_list(
+            'recipes', *tag_fields
+        ):
+            self.tags[recipe].append(dict(zip(tag_fields, tag)))
+        self.ingredients = defaultdict(list)
+        amount_fields = AddAmountSerializer.Meta.fields
+        for recipe, *amount in AddAmount.objects.filter(
+            recipe__in=ids
+        ).order_by('id').values_list(
+            'recipe', 'ingredients__id', 'ingredients__name',
+            'ingredients__measurement_unit', 'amount'
+        ):
+            self.ingredients[recipe].append(dict(zip(amount_fields, amount)))
+        authors = UserProjection(self.request)
+        self.authors = {
+            author['id']: author for author in authors.represent(
+                authors.get_rows(User.objects.filter(
+                    pk__in={row['author'] for row in rows}
+                ))
+            )
+        }
+
+    def project_tags(self, row):
+        return self.tags[row['id']]
+
+    def project_author(self, row):
+        return self.authors.get(row['author'])
+
+    def project_ingredients(self, row):
+        return self.ingredients[row['id']]
+
+
+class SubscriptionProjection(Projection):
+    """Строки - подписки, поля автора читаются через author__."""
+    serializer_class = SubscriptionListSerializer
+    columns = {
+        name: f'author__{name}'
+        for name in ('email', 'id', 'username', 'first_name', 'last_name',
+                     'recipes_count')
+    }
+
+    def __init__(self, request, recipes_limit=None):
+        super().__init__(request)
+        self.recipes_limit = recipes_limit
+
+    def load(self, rows):
+        recipes = PartialRecipeProjection(self.request)
+        columns = ('id', 'name', 'cooking_time')
+        self.recipes = {
+            author: recipes.represent(
+                {
+                    **{column: getattr(recipe, column) for column in columns},
+                    **{column: getattr(recipe, column).name
+                       for column in RECIPE_IMAGE_COLUMNS},
+                }
+                for recipe in author_recipes
+            )
+            for author, author_recipes in get_recipes_by_author(
+                [row['author__id'] for row in rows], self.recipes_limit
+            ).items()
+        }
+
+    def project_is_subscribed(self, row):
+        return True
+
+    def project_recipes(self, row):
+        return self.recipes.get(row['author__id'], [])
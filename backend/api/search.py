@@ -0,0 +1,74 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+WORD_RE = re.compile(r'\w+')
+
+
+def search_postgresql(queryset, query):
+    """tsvector из name (вес A) и text (вес B) плюс триграммы по name.
+
+    Оба условия обслуживаются GIN-индексами из миграции 0003.
+    """
+    match = RawSQL(
+        'recipes_recipe.search_vector @@ '
+        'websearch_to_tsquery(%s::regconfig, %s) '
+        'OR recipes_recipe.name %% %s',
+        (SEARCH_CONFIG, query, query),
+        output_field=BooleanField()
+    )
+    rank = RawSQL(
+        'ts_rank(recipes_recipe.search_vector, '
+        'websearch_to_tsquery(%s::regconfig, %s)) '
+        '+ similarity(recipes_recipe.name, %s)',
+        (SEARCH_CONFIG, query, query),
+        output_field=FloatField()
+    )
+    return queryset.annotate(
+        search_match=match, search_rank=rank
+    ).filter(search_match=True)
+
+
+def search_sqlite(queryset, query):
+    """Поиск по FTS5-таблице recipes_recipe_search с ранжированием bm25."""
+    match = ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+    rank = RawSQL(
+        'SELECT -bm25(recipes_recipe_search, 10.0, 1.0) '
+        'FROM recipes_recipe_search '
+        'WHERE recipes_recipe_search MATCH %s '
+        'AND recipes_recipe_search.rowid = recipes_recipe.id',
+        (match,),
+        output_field=FloatField()
+    )
+    return queryset.filter(id__in=RawSQL(
+        'SELECT rowid FROM recipes_recipe_search '
+        'WHERE recipes_recipe_search MATCH %s',
+        (match,)
+    )).annotate(search_rank=rank)
+
+
+def search_fallback(queryset, query):
+    for word in WORD_RE.findall(query):
+        queryset = queryset.filter(
+            Q(name__icontains=word) | Q(text__icontains=word)
+        )
+    return queryset.annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
+
+
+SEARCH_BACKENDS = {
+    'postgresql': search_postgresql,
+    'sqlite': search_sqlite,
+}
+
+
+def search_recipes(queryset, query):
+    """Фильтрует рецепты по запросу и сортирует по релевантности."""
+    if not WORD_RE.search(query):
+        return queryset.none()
+    search = SEARCH_BACKENDS.get(connection.vendor, search_fallback)
+    return search(queryset, query).order_by('-search_rank', '-pub_date')
@@ -1,8 +1,11 @@
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
+from recipes.images import IMAGE_VARIANTS, schedule_recipe_image
 from recipes.models import (AddAmount, Favorite, Ingredient, Recipe,
                             ShoppingCart, Tag)
+from recipes.utils import delete_rows, update_shopping_lists
 from rest_framework import exceptions, serializers, status, validators
 from users.models import Subscription, User
 
@@ -38,6 +41,9 @@ class CustomUserSerializer(UserSerializer):
         ]
 
     def get_is_subscribed(self, obj):
+        is_subscribed = getattr(obj, 'is_subscribed', None)
+        if is_subscribed is not None:
+            return is_subscribed
         user = self.context.get('request').user
         return user.is_authenticated and obj.following.filter(user=user).exists()
 
@@ -109,11 +115,45 @@ class AccountSerializer(CustomUserSerializer):
     role = serializers.CharField(read_only=True)
 
 
+class ImageVariantsField(serializers.Field):
+    """Ссылки на уменьшенные копии изображения рецепта.
+
+    Пока копии не готовы, отдается ссылка на оригинал.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        request = self.context.get('request')
+        variants = {}
+        for name in IMAGE_VARIANTS:
+            url = (getattr(recipe, f'image_{name}') or recipe.image).url
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            variants[name] = url
+        return variants
+
+
 class PartialRecipeSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time',)
+
+
+def get_recipes_limit(request):
+    """recipes_limit из запроса: нечисловое значение не учитывается,
+    отрицательное считается нулем."""
+    try:
+        return max(int(request.query_params['recipes_limit']), 0)
+    except (KeyError, ValueError):
+        return None
 
 
 class SubscriptionListSerializer(CustomUserSerializer):
@@ -138,9 +178,12 @@ class SubscriptionListSerializer(CustomUserSerializer):
         if not request or request.user.is_anonymous:
             return False
         context = {'request': request}
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit is not None:
-            recipes = obj.recipes.all()[:int(recipes_limit)]
+        recipes_by_author = self.context.get('recipes_by_author')
+        recipes_limit = get_recipes_limit(request)
+        if recipes_by_author is not None:
+            recipes = recipes_by_author[obj.id]
+        elif recipes_limit is not None:
+            recipes = obj.recipes.all()[:recipes_limit]
         else:
             recipes = obj.recipes.all()
         return PartialRecipeSerializer(
@@ -149,7 +192,7 @@ class SubscriptionListSerializer(CustomUserSerializer):
     def get_recipes_count(self, obj):
         user = self.context.get('request').user
         if user.is_authenticated:
-            return Recipe.objects.filter(author=obj).count()
+            return obj.recipes_count
         raise exceptions.NotAuthenticated(
             detail='Учетные данные не были предоставлены.',
             code=status.HTTP_401_UNAUTHORIZED
@@ -190,10 +233,8 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return data
 
     def to_representation(self, instance):
-        request = self.context.get('request')
-        context = {'request': request}
         return SubscriptionListSerializer(
-            instance.author, context=context).data
+            instance.author, context=self.context).data
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -217,7 +258,8 @@ class AddAmountSerializer(serializers.ModelSerializer):
 
 
 class AddAmountCUDSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    # Ингредиенты разом подгружает RecipeManipulationSerializer.validate.
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -246,6 +288,7 @@ class RecipeListRetrieveSerializer(serializers.ModelSerializer):
         method_name='get_is_in_shopping_cart',
         read_only=True
     )
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -257,16 +300,20 @@ class RecipeListRetrieveSerializer(serializers.ModelSerializer):
                   'is_in_shopping_cart',
                   'name',
                   'image',
+                  'image_variants',
                   'text',
                   'cooking_time',)
 
     def get_ingredients(self, obj):
-        ingredients = AddAmount.objects.filter(recipe=obj)
+        ingredients = obj.ingredients_recipes.all()
         return AddAmountSerializer(ingredients, many=True).data
 
     def get_is_favorited(self, obj):
         if self.context.get('request').method == 'POST':
             return False
+        is_favorited = getattr(obj, 'is_favorited', None)
+        if is_favorited is not None:
+            return is_favorited
         user = self.context.get('request').user
         if user.is_authenticated:
             return user.user_favorite.filter(recipe=obj).exists()
@@ -275,6 +322,9 @@ class RecipeListRetrieveSerializer(serializers.ModelSerializer):
     def get_is_in_shopping_cart(self, obj):
         if self.context.get('request').method == 'POST':
             return False
+        is_in_shopping_cart = getattr(obj, 'is_in_shopping_cart', None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_authenticated:
             return user.user_cart.filter(recipe=obj).exists()
@@ -285,6 +335,9 @@ class RecipeManipulationSerializer(serializers.ModelSerializer):
     ingredients = AddAmountCUDSerializer(many=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True)
+    # Декодирование base64, проверка и хэш картинки остаются в запросе
+    # и растут с ее размером; вне запроса строятся только варианты.
+    # Тело запроса ограничено DATA_UPLOAD_MAX_MEMORY_SIZE.
     image = Base64ImageField()
 
     class Meta:
@@ -298,26 +351,32 @@ class RecipeManipulationSerializer(serializers.ModelSerializer):
                   'cooking_time',)
 
     def validate(self, data):
-        ingredients = self.initial_data['ingredients']
-        if not ingredients or len(ingredients) == 0:
+        ingredients = data.get('ingredients')
+        if ingredients is None and self.partial:
+            return data
+        if not ingredients:
             raise serializers.ValidationError(
                 {'ingredients': 'Укажите название и количество ингредиентов'}
             )
-        ingredients_id = []
+        ingredients_id = set()
         for item in ingredients:
-            ingredient = get_object_or_404(
-                Ingredient,
-                id=item['id']
-            )
-            if int(item.get('amount')) < 1:
+            if item['amount'] < 1:
                 raise serializers.ValidationError(
                     ({'amount': 'Укажите необходимое количество ингредиента}'})
                 )
-            if ingredient in ingredients_id:
+            if item['id'] in ingredients_id:
                 raise serializers.ValidationError(
                     ({'ingredients': 'Ингредиент уже использован.'})
                 )
-            ingredients_id.append(ingredient)
+            ingredients_id.add(item['id'])
+        found = Ingredient.objects.in_bulk(ingredients_id)
+        missing = sorted(ingredients_id - found.keys())
+        if missing:
+            raise serializers.ValidationError(
+                {'ingredients': f'Ингредиенты не найдены: {missing}'}
+            )
+        for item in ingredients:
+            item['id'] = found[item['id']]
         return data
 
     def create_ingredients(self, recipe, ingredients):
@@ -330,33 +389,97 @@ class RecipeManipulationSerializer(serializers.ModelSerializer):
             ))
         return AddAmount.objects.bulk_create(bulk_list)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(recipe, ingredients)
+        schedule_recipe_image(recipe.id)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients):
+        """Применяет к составу рецепта только изменившиеся строки."""
+        current = {}
+        old_amounts = {}
+        to_delete = []
+        for amount in AddAmount.objects.filter(recipe=recipe):
+            ingredient_id = amount.ingredients_id
+            old_amounts[ingredient_id] = (
+                old_amounts.get(ingredient_id, 0) + amount.amount)
+            if ingredient_id in current:
+                to_delete.append(amount.id)
+            else:
+                current[ingredient_id] = amount
+        new_amounts = {
+            item['id'].id: item['amount'] for item in ingredients}
+        to_create = []
+        to_update = []
+        for ingredient_id, value in new_amounts.items():
+            amount = current.get(ingredient_id)
+            if amount is None:
+                to_create.append(AddAmount(
+                    recipe=recipe,
+                    ingredients_id=ingredient_id,
+                    amount=value,
+                ))
+            elif amount.amount != value:
+                amount.amount = value
+                to_update.append(amount)
+        to_delete.extend(
+            amount.id for ingredient_id, amount in current.items()
+            if ingredient_id not in new_amounts)
+        if to_delete:
+            # Без сигналов AddAmount: списки покупок сдвигаются ниже
+            # одной дельтой, версии сбросит instance.save().
+            delete_rows(AddAmount.objects.filter(id__in=to_delete))
+        if to_update:
+            AddAmount.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            AddAmount.objects.bulk_create(to_create)
+        update_shopping_lists(recipe, old_amounts, new_amounts)
+
+    def update_image(self, recipe, image):
+        """Подменяет картинку, только если изменилось ее содержимое."""
+        field = recipe.image.field
+        name = field.storage.get_content_name(
+            field.generate_filename(recipe, image.name), image)
+        if name == recipe.image.name:
+            return False
+        recipe.image = image
+        for variant in IMAGE_VARIANTS:
+            setattr(recipe, f'image_{variant}', None)
+        return True
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        recipe = instance
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
         instance.cooking_time = validated_data.get(
             'cooking_time',
             instance.cooking_time
         )
-        instance.tags.clear()
         tags = validated_data.get('tags')
-        instance.tags.set(tags)
-        AddAmount.objects.filter(recipe=recipe).all().delete()
+        if tags is not None:
+            # set() сам вычисляет разницу и трогает только лишние связи.
+            instance.tags.set(tags)
         ingredients = validated_data.get('ingredients')
-        self.create_ingredients(recipe, ingredients)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        image = validated_data.get('image')
+        image_changed = (
+            image is not None and self.update_image(instance, image))
         instance.save()
+        if image_changed:
+            schedule_recipe_image(instance.id)
         return instance
 
-
     def to_representation(self, instance):
+        prefetch_related_objects([instance], Prefetch(
+            'ingredients_recipes',
+            AddAmount.objects.select_related('ingredients')
+        ))
         return RecipeListRetrieveSerializer(
             instance,
             context={'request': self.context.get('request')}).data
@@ -425,3 +548,11 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         context = {'request': request}
         return PartialRecipeSerializer(
             instance.recipe, context=context).data
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
@@ -0,0 +1,145 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from recipes.counters import COUNTERS, update_counter
+from recipes.models import (AddAmount, ChangeVersion, Ingredient, Recipe,
+                            ShoppingCart, Tag)
+from recipes.utils import (add_to_shopping_list,
+                           rebuild_recipe_shopping_lists,
+                           remove_from_shopping_list)
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from . import cache
+from .authentication import invalidate_tokens, invalidate_user_tokens
+
+CHANGE_VERSIONS = {
+    Tag: 'tag',
+    Ingredient: 'ingredient',
+    Recipe: 'recipe',
+    AddAmount: 'recipe',
+    Recipe.tags.through: 'recipe',
+    User: 'user',
+}
+
+
+@receiver((post_save, post_delete))
+def bump_change_version(sender, update_fields=None, **kwargs):
+    name = CHANGE_VERSIONS.get(sender)
+    if name is None:
+        return
+    if sender is User and update_fields and set(update_fields) == {
+        'last_login'
+    }:
+        return
+    ChangeVersion.bump_on_commit(name)
+
+
+@receiver(post_save)
+def increment_counter(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and sender in COUNTERS:
+        _, link, _ = COUNTERS[sender]
+        update_counter(sender, [getattr(instance, f'{link}_id')])
+
+
+@receiver(post_delete)
+def decrement_counter(sender, instance, **kwargs):
+    if sender in COUNTERS:
+        _, link, _ = COUNTERS[sender]
+        update_counter(sender, [getattr(instance, f'{link}_id')], -1)
+
+
+@receiver(pre_save, sender=ShoppingCart)
+def remove_changed_cart_from_shopping_list(instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    old = ShoppingCart.objects.filter(pk=instance.pk).values_list(
+        'user', 'recipe'
+    ).first()
+    if old is not None:
+        remove_from_shopping_list(*old)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_cart_to_shopping_list(instance, raw=False, **kwargs):
+    if not raw:
+        add_to_shopping_list(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_cart_from_shopping_list(instance, **kwargs):
+    # В pre_delete состав рецепта еще на месте, даже при каскадном
+    # удалении рецепта или пользователя.
+    remove_from_shopping_list(instance.user_id, instance.recipe_id)
+
+
+@receiver((post_save, post_delete), sender=AddAmount)
+def rebuild_amount_shopping_lists(instance, raw=False, **kwargs):
+    if not raw:
+        rebuild_recipe_shopping_lists(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_tags_version(action, **kwargs):
+    if action.startswith('post_'):
+        ChangeVersion.bump_on_commit('recipe')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def bump_recipe_generations(instance, **kwargs):
+    cache.bump_generations_on_commit(
+        'list', cache.recipe_generation(instance.pk)
+    )
+
+
+@receiver((post_save, post_delete), sender=AddAmount)
+def bump_recipe_amount_generations(instance, **kwargs):
+    cache.bump_generations_on_commit(
+        'list', cache.recipe_generation(instance.recipe_id)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_tags_generations(instance, action, reverse, pk_set,
+                                 **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipes = (instance.pk,)
+    elif pk_set:
+        recipes = pk_set
+    else:
+        recipes = ()
+        cache.bump_generations_on_commit('tag')
+    cache.bump_generations_on_commit(
+        'list', *(cache.recipe_generation(recipe) for recipe in recipes)
+    )
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tag_generation(**kwargs):
+    cache.bump_generations_on_commit('tag')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredient_generation(**kwargs):
+    cache.bump_generations_on_commit('ingredient')
+
+
+@receiver((post_save, post_delete), sender=User)
+def bump_user_generation(update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    cache.bump_generations_on_commit('user')
+
+
+@receiver((post_save, post_delete), sender=Token)
+def invalidate_cached_token(instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_cached_user_tokens(instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate_user_tokens(instance.pk)
@@ -0,0 +1,88 @@
+import gzip
+import re
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from recipes.models import ChangeVersion, Ingredient, Tag
+
+from .metrics import count_cache
+from .renderers import ORJSONRenderer
+from .serializers import IngredientSerializer, TagSerializer
+
+SNAPSHOT_PREFIX = 'catalogue-snapshot:'
+# Снимки старых версий больше не читаются и истекают сами.
+SNAPSHOT_TIMEOUT = 24 * 60 * 60
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+# Каталог: (модель, сериализатор, имя версии таблицы).
+CATALOGUES = {
+    'tags': (Tag, TagSerializer, 'tag'),
+    'ingredients': (Ingredient, IngredientSerializer, 'ingredient'),
+}
+
+
+def get_cache():
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def get_snapshot_key(name, version):
+    return f'{SNAPSHOT_PREFIX}{name}:{version}'
+
+
+def build_snapshot(name, version):
+    """Сериализует весь каталог в JSON и сразу сжимает его."""
+    model, serializer_class, _ = CATALOGUES[name]
+    body = ORJSONRenderer().render(
+        serializer_class(model.objects.all(), many=True).data
+    )
+    snapshot = {
+        'etag': quote_etag(md5(body).hexdigest()),
+        'body': body,
+        'gzip': gzip.compress(body),
+    }
+    # Внутри транзакции версия может откатиться и достаться другим
+    # данным, поэтому такой снимок не сохраняется.
+    if not connection.in_atomic_block:
+        get_cache().set(
+            get_snapshot_key(name, version), snapshot, SNAPSHOT_TIMEOUT
+        )
+    return snapshot
+
+
+def get_snapshot(name):
+    """Снимок текущей версии каталога.
+
+    Ключ содержит версию таблицы из базы, поэтому изменение,
+    закоммиченное любым процессом, сразу дает новый ключ, а
+    сбрасывать кэш не нужно. Версия читается до строк каталога.
+    """
+    version = ChangeVersion.get_version(CATALOGUES[name][2])
+    snapshot = get_cache().get(get_snapshot_key(name, version))
+    count_cache('snapshots', snapshot is not None)
+    if snapshot is None:
+        snapshot = build_snapshot(name, version)
+    return snapshot
+
+
+def snapshot_response(request, name):
+    """Отдает готовые байты каталога, из базы читается только версия."""
+    snapshot = get_snapshot(name)
+    etag = snapshot['etag']
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    elif ACCEPTS_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response = HttpResponse(
+            snapshot['gzip'], content_type='application/json'
+        )
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(
+            snapshot['body'], content_type='application/json'
+        )
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
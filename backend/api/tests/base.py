@@ -0,0 +1,98 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from recipes.models import AddAmount, Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_image_bytes(color=(200, 120, 40)):
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def get_image(name, color=(200, 120, 40)):
+    return SimpleUploadedFile(name, get_image_bytes(color), 'image/png')
+
+
+def get_base64_image(color=(200, 120, 40)):
+    return 'data:image/png;base64,' + base64.b64encode(
+        get_image_bytes(color)).decode()
+
+
+def create_user(username, **kwargs):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com',
+        password='Pass-12345', **kwargs
+    )
+
+
+def create_recipe(author, amounts, tags=(), name='Рецепт', text='Описание'):
+    """Рецепт с составом amounts {ингредиент: количество}."""
+    recipe = Recipe.objects.create(
+        author=author, name=name, text=text, cooking_time=10,
+        image=get_image('recipe.png'),
+    )
+    recipe.tags.set(tags)
+    AddAmount.objects.bulk_create(
+        AddAmount(recipe=recipe, ingredients=ingredient, amount=amount)
+        for ingredient, amount in amounts.items()
+    )
+    return recipe
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_ASYNC=False)
+class APITestCase(TestCase):
+    """Автор, читатель, теги и ингредиенты; кэши чистые в каждом тесте.
+
+    Версии таблиц, поколения кэша и пересчеты списков покупок
+    выполняются после коммита, поэтому записи, от которых зависят
+    проверки, оборачиваются в captureOnCommitCallbacks(execute=True).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        cls.tags = [
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ('Завтрак', '#E26C2D', 'breakfast'),
+                ('Обед', '#49B64E', 'lunch'),
+            )
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('сахар', 'соль', 'мука')
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.anon_client = get_client()
+        self.author_client = get_client(self.author)
+        self.reader_client = get_client(self.reader)
@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from ..authentication import (CACHED_USER_FIELDS, get_cache,
+                              get_token_cache_key)
+from ..checks import check_token_cache
+from .base import APITestCase
+from .test_throttling import DUMMY_CACHES, LOCMEM_CACHES, MEMCACHED_CACHES
+
+
+class TokenCacheTests(APITestCase):
+    """Кэш токенов: проекция пользователя без пароля и ее сброс."""
+
+    def setUp(self):
+        super().setUp()
+        # LocMemCache в тестах общий для всех запросов, как memcached.
+        patcher = mock.patch(
+            'api.authentication.is_shared_cache_required',
+            return_value=False
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.key = Token.objects.get(user=self.reader).key
+
+    def me(self):
+        return self.reader_client.get('/api/users/me/')
+
+    def token_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.me()
+        self.assertEqual(response.status_code, 200)
+        return [
+            query for query in captured
+            if 'authtoken_token' in query['sql']
+        ]
+
+    def test_token_is_read_once(self):
+        self.assertTrue(self.token_queries())
+        self.assertEqual(self.token_queries(), [])
+        self.assertEqual(self.me().json()['username'], 'reader')
+
+    def test_cache_holds_projection_without_password(self):
+        self.me()
+        values = get_cache().get(get_token_cache_key(self.key))
+        self.assertEqual(set(values), set(CACHED_USER_FIELDS))
+        self.assertNotIn('password', values)
+
+    def test_logout_revokes_cached_token(self):
+        self.me()
+        response = self.reader_client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_deactivation_revokes_cached_token(self):
+        self.me()
+        self.reader.is_active = False
+        self.reader.save()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_password_change_through_cached_user(self):
+        self.me()
+        response = self.reader_client.post('/api/users/set_password/', {
+            'current_password': 'Pass-12345',
+            'new_password': 'New-pass-67890',
+        }, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(get_cache().get(get_token_cache_key(self.key)))
+        response = self.anon_client.post('/api/auth/token/login/', {
+            'email': self.reader.email, 'password': 'New-pass-67890',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_process_local_cache_is_bypassed(self):
+        with mock.patch(
+            'api.authentication.is_shared_cache_required', return_value=True
+        ):
+            self.me()
+            self.assertTrue(self.token_queries())
+        self.assertIsNone(get_cache().get(get_token_cache_key(self.key)))
+
+
+class TokenCacheCheckTests(SimpleTestCase):
+    """api.W001 для кэша токенов, локального для процесса."""
+
+    def get_ids(self):
+        return [message.id for message in check_token_cache(None)]
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual(self.get_ids(), ['api.W001'])
+
+    @override_settings(CACHES=MEMCACHED_CACHES)
+    def test_memcached_passes(self):
+        self.assertEqual(self.get_ids(), [])
+
+    @override_settings(CACHES=DUMMY_CACHES)
+    def test_dummy_cache_is_not_reported(self):
+        self.assertEqual(self.get_ids(), [])
@@ -0,0 +1,112 @@
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+from users.models import Subscription, User
+
+from .base import APITestCase, create_recipe, create_user
+
+
+class BulkRelationTests(APITestCase):
+    """Пакетные избранное, корзина и подписки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        sugar, salt, _ = cls.ingredients
+        cls.first = create_recipe(cls.author, {sugar: 10}, name='Первый')
+        cls.second = create_recipe(
+            cls.author, {sugar: 5, salt: 1}, name='Второй'
+        )
+        cls.other_author = create_user('other')
+
+    def send(self, method, url, ids):
+        return getattr(self.reader_client, method)(
+            url, {'ids': ids}, format='json'
+        )
+
+    def get_statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [(item['id'], item['status']) for item in response.json()]
+
+    def test_favorites_are_added_and_removed(self):
+        Favorite.objects.create(user=self.reader, recipe=self.second)
+        url = '/api/recipes/favorite/'
+        ids = [self.first.id, self.second.id, self.first.id, 999]
+        self.assertEqual(self.get_statuses(self.send('post', url, ids)), [
+            (self.first.id, 'created'),
+            (self.second.id, 'exists'),
+            (999, 'not_found'),
+        ])
+        self.assertEqual(
+            Favorite.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertEqual(self.get_statuses(self.send('delete', url, ids)), [
+            (self.first.id, 'deleted'),
+            (self.second.id, 'deleted'),
+            (999, 'not_found'),
+        ])
+        self.assertEqual(
+            self.get_statuses(self.send('delete', url, [self.first.id])),
+            [(self.first.id, 'absent')]
+        )
+        self.assertFalse(Favorite.objects.filter(user=self.reader).exists())
+
+    def test_counters_follow_bulk_changes(self):
+        url = '/api/recipes/favorite/'
+        self.send('post', url, [self.first.id, self.second.id])
+        self.assertEqual(
+            Recipe.objects.get(pk=self.first.pk).favorites_count, 1
+        )
+        self.send('delete', url, [self.first.id])
+        self.assertEqual(
+            Recipe.objects.get(pk=self.first.pk).favorites_count, 0
+        )
+        self.assertEqual(
+            Recipe.objects.get(pk=self.second.pk).favorites_count, 1
+        )
+
+    def test_cart_updates_shopping_list(self):
+        url = '/api/recipes/shopping_cart/'
+        self.send('post', url, [self.first.id, self.second.id])
+        self.assertEqual(
+            ShoppingCart.objects.filter(user=self.reader).count(), 2
+        )
+        totals = ShoppingListItem.objects.filter(user=self.reader)
+        self.assertEqual(
+            dict(totals.values_list('ingredient__name', 'amount')),
+            {'сахар': 15, 'соль': 1}
+        )
+        self.send('delete', url, [self.second.id])
+        self.assertEqual(
+            dict(totals.values_list('ingredient__name', 'amount')),
+            {'сахар': 10}
+        )
+
+    def test_subscriptions_skip_self(self):
+        response = self.send('post', '/api/users/subscribe/', [
+            self.author.id, self.other_author.id, self.reader.id
+        ])
+        self.assertEqual(self.get_statuses(response), [
+            (self.author.id, 'created'),
+            (self.other_author.id, 'created'),
+            (self.reader.id, 'not_found'),
+        ])
+        self.assertEqual(
+            Subscription.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).followers_count, 1
+        )
+
+    def test_invalid_ids_are_rejected(self):
+        url = '/api/recipes/favorite/'
+        for ids in ([], [0], list(range(1, 102)), 'abc'):
+            with self.subTest(ids=ids):
+                self.assertEqual(
+                    self.send('post', url, ids).status_code, 400
+                )
+
+    def test_anonymous_is_rejected(self):
+        response = self.anon_client.post(
+            '/api/recipes/favorite/', {'ids': [self.first.id]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 401)
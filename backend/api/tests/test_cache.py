@@ -0,0 +1,69 @@
+from .base import APITestCase, create_recipe
+
+
+class AnonymousCacheTests(APITestCase):
+    """Кэш ответов для анонимов и его сброс поколениями."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = create_recipe(
+            cls.author, {cls.ingredients[0]: 1}, cls.tags, name='Блины'
+        )
+
+    def get(self, url, client=None):
+        response = (client or self.anon_client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def rename(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.patch(
+                f'/api/recipes/{self.recipe.id}/', {'name': name},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.assertEqual(self.get('/api/recipes/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get('/api/recipes/')['X-Cache'], 'HIT')
+
+    def test_query_order_does_not_matter(self):
+        self.get('/api/recipes/?tags=lunch&tags=breakfast&limit=2')
+        response = self.get('/api/recipes/?limit=2&tags=breakfast&tags=lunch')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_authenticated_requests_bypass_cache(self):
+        response = self.get('/api/recipes/', self.reader_client)
+        self.assertNotIn('X-Cache', response)
+
+    def test_edit_invalidates_list_and_detail(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        self.get('/api/recipes/')
+        self.get(url)
+        self.rename('Оладьи')
+        response = self.get('/api/recipes/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['name'], 'Оладьи')
+        response = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['name'], 'Оладьи')
+
+    def test_non_canonical_id_is_invalidated(self):
+        url = f'/api/recipes/0{self.recipe.id}/'
+        self.get(url)
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+        self.rename('Оладьи')
+        self.assertEqual(self.get(url).json()['name'], 'Оладьи')
+
+    def test_generations_move_after_commit(self):
+        self.get('/api/recipes/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.author_client.patch(
+                f'/api/recipes/{self.recipe.id}/', {'name': 'Оладьи'},
+                format='json'
+            )
+        self.assertEqual(self.get('/api/recipes/')['X-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get('/api/recipes/')['X-Cache'], 'MISS')
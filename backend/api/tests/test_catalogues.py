@@ -0,0 +1,57 @@
+from recipes.models import Ingredient
+
+from ..ingredient_index import ingredient_index
+from .base import APITestCase
+
+
+class CatalogueTests(APITestCase):
+    """Снимки тегов и ингредиентов и поиск ингредиентов по имени."""
+
+    def setUp(self):
+        super().setUp()
+        # Версии таблиц откатываются вместе с тестом и повторяются,
+        # а индекс живет в памяти процесса: его нужно строить заново.
+        ingredient_index._version = None
+
+    def get(self, url, etag=None, **headers):
+        if etag is not None:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        return self.anon_client.get(url, **headers)
+
+    def test_snapshot_answers_not_modified(self):
+        response = self.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [tag['slug'] for tag in response.json()],
+            ['breakfast', 'lunch']
+        )
+        response = self.get('/api/tags/', response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_snapshot_is_gzipped_on_request(self):
+        response = self.get('/api/ingredients/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_snapshot_follows_committed_change(self):
+        etag = self.get('/api/ingredients/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='мед', measurement_unit='г')
+        response = self.get('/api/ingredients/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('мед', [item['name'] for item in response.json()])
+
+    def test_name_search_has_validators(self):
+        response = self.get('/api/ingredients/?name=са')
+        self.assertEqual(
+            [item['name'] for item in response.json()], ['сахар']
+        )
+        response = self.get('/api/ingredients/?name=са', response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='сало', measurement_unit='г')
+        response = self.get('/api/ingredients/?name=са', response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['name'] for item in response.json()], ['сало', 'сахар']
+        )
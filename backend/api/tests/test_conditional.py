@@ -0,0 +1,78 @@
+from recipes.models import Favorite
+
+from .base import APITestCase, create_recipe
+
+
+class ConditionalGetTests(APITestCase):
+    """ETag и Last-Modified рецептов, ответы 304."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Дата изменения берется из версий таблиц, а их сдвигают
+        # колбэки после коммита.
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.recipe = create_recipe(
+                cls.author, {cls.ingredients[0]: 1}, cls.tags
+            )
+
+    def get(self, client, url, etag=None):
+        if etag is None:
+            return client.get(url)
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_list_answers_not_modified(self):
+        response = self.get(self.anon_client, '/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('Authorization', response['Vary'])
+        response = self.get(
+            self.anon_client, '/api/recipes/', response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_recipe_change_gives_new_etag(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = self.get(self.anon_client, url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author_client.patch(url, {'name': 'Другое'}, format='json')
+        response = self.get(self.anon_client, url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['name'], 'Другое')
+
+    def test_user_relations_change_only_own_etag(self):
+        reader_etag = self.get(self.reader_client, '/api/recipes/')['ETag']
+        author_etag = self.get(self.author_client, '/api/recipes/')['ETag']
+        self.reader_client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        response = self.get(self.reader_client, '/api/recipes/', reader_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'][0]['is_favorited'])
+        response = self.get(self.author_client, '/api/recipes/', author_etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_removed_relation_changes_etag(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        etag = self.get(self.reader_client, '/api/recipes/')['ETag']
+        self.reader_client.delete(f'/api/recipes/{self.recipe.id}/favorite/')
+        response = self.get(self.reader_client, '/api/recipes/', etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_subscription_changes_detail_etag(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        response = self.get(self.reader_client, url)
+        self.assertNotIn('Last-Modified', response)
+        self.reader_client.post(f'/api/users/{self.author.id}/subscribe/')
+        response = self.get(self.reader_client, url, response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['author']['is_subscribed'])
+
+    def test_etags_are_per_user(self):
+        reader_etag = self.get(self.reader_client, '/api/recipes/')['ETag']
+        response = self.get(self.author_client, '/api/recipes/', reader_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_recipe_is_not_found(self):
+        response = self.get(self.anon_client, '/api/recipes/999/', '"x"')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from recipes.models import Favorite, Recipe
+from users.models import User
+
+from .base import APITestCase, create_recipe, get_base64_image
+
+
+class CounterTests(APITestCase):
+    """Счетчики избранного, корзин, рецептов и подписчиков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = create_recipe(cls.author, {cls.ingredients[0]: 1})
+
+    def get_recipe(self):
+        return Recipe.objects.get(pk=self.recipe.pk)
+
+    def get_author(self):
+        return User.objects.get(pk=self.author.pk)
+
+    def test_favorite_and_cart_counters(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        self.reader_client.post(url + 'favorite/')
+        self.author_client.post(url + 'favorite/')
+        self.reader_client.post(url + 'shopping_cart/')
+        recipe = self.get_recipe()
+        self.assertEqual(recipe.favorites_count, 2)
+        self.assertEqual(recipe.in_carts_count, 1)
+        self.reader_client.delete(url + 'favorite/')
+        self.reader_client.delete(url + 'shopping_cart/')
+        recipe = self.get_recipe()
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.in_carts_count, 0)
+
+    def test_recipe_counter_follows_create_and_delete(self):
+        response = self.author_client.post('/api/recipes/', {
+            'ingredients': [{'id': self.ingredients[1].id, 'amount': 2}],
+            'tags': [self.tags[0].id],
+            'image': get_base64_image(),
+            'name': 'Новый',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get_author().recipes_count, 2)
+        self.author_client.delete(f'/api/recipes/{response.json()["id"]}/')
+        self.assertEqual(self.get_author().recipes_count, 1)
+
+    def test_subscriptions_show_stored_recipe_count(self):
+        self.reader_client.post(f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(self.get_author().followers_count, 1)
+        response = self.reader_client.get('/api/users/subscriptions/')
+        self.assertEqual(response.json()['results'][0]['recipes_count'], 1)
+        self.reader_client.delete(f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(self.get_author().followers_count, 0)
+
+    def test_cascade_delete_decrements(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        self.reader.delete()
+        self.assertEqual(self.get_recipe().favorites_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(favorites_count=7)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_counters', check=True, stdout=StringIO())
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.get_recipe().favorites_count, 0)
+        call_command('reconcile_counters', check=True, stdout=StringIO())
@@ -0,0 +1,50 @@
+import os
+import shutil
+import time
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from recipes.storage import recipe_image_storage
+
+from .base import MEDIA_ROOT, APITestCase, create_recipe, get_image_bytes
+
+
+class RecipeImageStorageTests(APITestCase):
+    """Хранилище по хэшу содержимого и сборщик осиротевших блобов."""
+
+    def collect(self):
+        output = StringIO()
+        call_command('collect_recipe_images', stdout=output)
+        return output.getvalue()
+
+    def test_same_content_is_stored_once(self):
+        first = recipe_image_storage.save(
+            'recipes/a.png', ContentFile(get_image_bytes()))
+        second = recipe_image_storage.save(
+            'recipes/b.png', ContentFile(get_image_bytes()))
+        self.assertEqual(first, second)
+
+    def test_dedup_hit_protects_blob_from_collector(self):
+        name = recipe_image_storage.save(
+            'recipes/a.png', ContentFile(get_image_bytes((1, 2, 3))))
+        path = recipe_image_storage.path(name)
+        os.utime(path, (0, 0))
+        recipe_image_storage.save(
+            'recipes/b.png', ContentFile(get_image_bytes((1, 2, 3))))
+        self.assertLess(time.time() - os.path.getmtime(path), 60)
+        self.collect()
+        self.assertTrue(os.path.exists(path))
+
+    def test_old_orphans_are_collected(self):
+        recipe = create_recipe(self.author, {self.ingredients[0]: 1})
+        name = recipe_image_storage.save(
+            'recipes/a.png', ContentFile(get_image_bytes((4, 5, 6))))
+        os.utime(recipe_image_storage.path(name), (0, 0))
+        self.assertIn(f'orphan: {name}', self.collect())
+        self.assertFalse(recipe_image_storage.exists(name))
+        self.assertTrue(recipe_image_storage.exists(recipe.image.name))
+
+    def test_missing_media_directory(self):
+        shutil.rmtree(os.path.join(MEDIA_ROOT, 'recipes'), ignore_errors=True)
+        self.assertIn('0 orphans', self.collect())
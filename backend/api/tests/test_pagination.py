@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from recipes.models import Recipe
+
+from .base import APITestCase, create_recipe
+
+
+class CursorPaginationTests(APITestCase):
+    """Курсорный режим ленты рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        sugar = cls.ingredients[0]
+        start = datetime(2024, 1, 1)
+        # Два рецепта с одной датой проверяют порядок по id.
+        for number, day in enumerate((0, 1, 1, 2, 3)):
+            recipe = create_recipe(
+                cls.author, {sugar: 1}, name=f'Рецепт {number}'
+            )
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=start + timedelta(days=day)
+            )
+        cls.expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True))
+
+    def walk(self, url):
+        ids = []
+        while url is not None:
+            response = self.reader_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertNotIn('count', page)
+            self.assertIsNone(page['previous'])
+            ids.extend(recipe['id'] for recipe in page['results'])
+            url = page['next']
+        return ids
+
+    def test_cursor_walk_matches_page_order(self):
+        response = self.reader_client.get('/api/recipes/', {'limit': 100})
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            self.expected
+        )
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=2'), self.expected
+        )
+
+    def test_cursor_keeps_position_when_new_recipe_appears(self):
+        response = self.reader_client.get('/api/recipes/?cursor=&limit=2')
+        first = [recipe['id'] for recipe in response.json()['results']]
+        create_recipe(self.author, {self.ingredients[0]: 1}, name='Новый')
+        rest = self.walk(response.json()['next'])
+        self.assertEqual(first + rest, self.expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.reader_client.get('/api/recipes/?cursor=bm9wZQ')
+        self.assertEqual(response.status_code, 404)
+
+    def test_search_falls_back_to_page_numbers(self):
+        response = self.reader_client.get(
+            '/api/recipes/', {'cursor': '', 'search': 'рецепт'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], len(self.expected))
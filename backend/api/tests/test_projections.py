@@ -0,0 +1,55 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+from ..projections import RecipeProjection
+from .base import APITestCase, create_recipe, create_user
+
+
+class ProjectionTests(APITestCase):
+    """Проекции должны отдавать те же байты, что и сериализаторы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        authors = [cls.author] + [
+            create_user(f'author{number}', first_name='Имя',
+                        last_name='Фамилия')
+            for number in range(2)
+        ]
+        for number in range(7):
+            ingredients = cls.ingredients[number % 3:]
+            recipe = create_recipe(
+                authors[number % len(authors)],
+                {
+                    ingredient: amount
+                    for amount, ingredient in enumerate(ingredients, start=1)
+                },
+                cls.tags[:number % 2 + 1],
+                name=f'Рецепт {number}',
+            )
+            if number % 2:
+                Favorite.objects.create(user=cls.reader, recipe=recipe)
+            if number % 3 == 0:
+                ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+        for author in authors[:2]:
+            Subscription.objects.create(user=cls.reader, author=author)
+
+    def compare(self):
+        call_command(
+            'compare_projections', repeat=1, user=self.reader.id,
+            stdout=StringIO()
+        )
+
+    def test_projections_match_serializers(self):
+        self.compare()
+
+    def test_difference_is_reported(self):
+        with mock.patch.object(
+            RecipeProjection, 'project_ingredients', return_value=[]
+        ), self.assertRaises(CommandError):
+            self.compare()
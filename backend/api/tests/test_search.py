@@ -0,0 +1,53 @@
+from .base import APITestCase, create_recipe
+
+
+class RecipeSearchTests(APITestCase):
+    """Полнотекстовый поиск по названию и описанию рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        sugar = cls.ingredients[0]
+        cls.pancakes = create_recipe(
+            cls.author, {sugar: 1}, name='Блины с медом',
+            text='Тонкие, на молоке.'
+        )
+        cls.soup = create_recipe(
+            cls.author, {sugar: 1}, name='Борщ',
+            text='Подавать, пока пекутся блины.'
+        )
+        cls.salad = create_recipe(
+            cls.author, {sugar: 1}, name='Салат', text='Без заправки.'
+        )
+
+    def search(self, query):
+        response = self.anon_client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_name_match_ranks_above_text_match(self):
+        self.assertEqual(
+            self.search('блины'), [self.pancakes.id, self.soup.id]
+        )
+
+    def test_words_match_by_prefix(self):
+        self.assertEqual(self.search('сала'), [self.salad.id])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search('блины мед'), [self.pancakes.id])
+
+    def test_query_without_words_finds_nothing(self):
+        self.assertEqual(self.search('!!! ---'), [])
+
+    def test_renamed_recipe_is_found_by_new_name(self):
+        response = self.author_client.patch(
+            f'/api/recipes/{self.salad.id}/', {'name': 'Винегрет'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search('винегрет'), [self.salad.id])
+        self.assertEqual(self.search('салат'), [])
+
+    def test_deleted_recipe_leaves_the_index(self):
+        self.author_client.delete(f'/api/recipes/{self.soup.id}/')
+        self.assertEqual(self.search('борщ'), [])
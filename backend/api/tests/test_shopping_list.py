@@ -0,0 +1,122 @@
+from recipes.models import AddAmount, ShoppingListItem
+from recipes.utils import (RecipeShoppingListsRebuild,
+                           get_expected_shopping_lists)
+
+from .base import APITestCase, create_recipe
+
+
+class ShoppingListTests(APITestCase):
+    """Итоги списка покупок следуют за корзиной и составом рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        sugar, salt, flour = cls.ingredients
+        cls.pancakes = create_recipe(
+            cls.author, {sugar: 10, flour: 200}, cls.tags, name='Блины'
+        )
+        cls.bread = create_recipe(
+            cls.author, {salt: 5, flour: 300}, cls.tags, name='Хлеб'
+        )
+
+    def get_list(self, user):
+        return dict(ShoppingListItem.objects.filter(user=user).values_list(
+            'ingredient__name', 'amount'
+        ))
+
+    def assertConsistent(self):
+        self.assertEqual(
+            {
+                (item.user_id, item.ingredient_id): item.amount
+                for item in ShoppingListItem.objects.all()
+            },
+            get_expected_shopping_lists()
+        )
+
+    def add_to_cart(self, recipe, client=None):
+        response = (client or self.reader_client).post(
+            f'/api/recipes/{recipe.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_cart_changes_update_totals(self):
+        self.add_to_cart(self.pancakes)
+        self.add_to_cart(self.bread)
+        self.assertEqual(
+            self.get_list(self.reader),
+            {'сахар': 10, 'соль': 5, 'мука': 500}
+        )
+        response = self.reader_client.delete(
+            f'/api/recipes/{self.pancakes.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_list(self.reader), {'соль': 5, 'мука': 300})
+        self.reader_client.delete(
+            f'/api/recipes/{self.bread.id}/shopping_cart/'
+        )
+        self.assertEqual(self.get_list(self.reader), {})
+
+    def test_recipe_edit_moves_totals_of_every_cart(self):
+        sugar, salt, flour = self.ingredients
+        self.add_to_cart(self.pancakes)
+        self.add_to_cart(self.pancakes, self.author_client)
+        self.add_to_cart(self.bread)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.patch(
+                f'/api/recipes/{self.pancakes.id}/',
+                {'ingredients': [
+                    {'id': sugar.id, 'amount': 15},
+                    {'id': salt.id, 'amount': 1},
+                ]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.get_list(self.reader),
+            {'сахар': 15, 'соль': 6, 'мука': 300}
+        )
+        self.assertEqual(self.get_list(self.author), {'сахар': 15, 'соль': 1})
+        self.assertConsistent()
+
+    def test_amount_edits_are_rebuilt_once_after_commit(self):
+        self.add_to_cart(self.pancakes)
+        self.add_to_cart(self.bread)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for amount in AddAmount.objects.filter(
+                recipe__in=(self.pancakes, self.bread)
+            ):
+                amount.amount += 1
+                amount.save()
+            self.assertEqual(self.get_list(self.reader)['мука'], 500)
+        self.assertEqual(len([
+            callback for callback in callbacks
+            if isinstance(callback, RecipeShoppingListsRebuild)
+        ]), 1)
+        self.assertEqual(
+            self.get_list(self.reader),
+            {'сахар': 11, 'соль': 6, 'мука': 502}
+        )
+        self.assertConsistent()
+
+    def test_recipe_delete_removes_its_totals(self):
+        self.add_to_cart(self.pancakes)
+        self.add_to_cart(self.bread)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.delete(
+                f'/api/recipes/{self.pancakes.id}/'
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_list(self.reader), {'соль': 5, 'мука': 300})
+        self.assertConsistent()
+
+    def test_download_lists_totals(self):
+        self.add_to_cart(self.pancakes)
+        self.add_to_cart(self.bread)
+        response = self.reader_client.get(
+            '/api/recipes/download_shopping_cart/?format=txt'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'мука - 500 г\nсахар - 10 г\nсоль - 5 г'
+        )
@@ -0,0 +1,39 @@
+from users.models import Subscription
+
+from .base import APITestCase, create_recipe, create_user
+
+
+class SubscriptionListTests(APITestCase):
+    """Страница подписок и параметр recipes_limit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        other = create_user('other')
+        for author, count in ((cls.author, 3), (other, 1)):
+            for number in range(count):
+                create_recipe(
+                    author, {cls.ingredients[0]: 1}, name=f'Рецепт {number}'
+                )
+            Subscription.objects.create(user=cls.reader, author=author)
+
+    def get_recipe_counts(self, recipes_limit=None):
+        params = {} if recipes_limit is None else {
+            'recipes_limit': recipes_limit
+        }
+        response = self.reader_client.get('/api/users/subscriptions/', params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            (len(author['recipes']), author['recipes_count'])
+            for author in response.json()['results']
+        ]
+
+    def test_recipes_are_limited_per_author(self):
+        self.assertEqual(self.get_recipe_counts(), [(3, 3), (1, 1)])
+        self.assertEqual(self.get_recipe_counts(2), [(2, 3), (1, 1)])
+
+    def test_invalid_limit_is_ignored(self):
+        self.assertEqual(self.get_recipe_counts('abc'), [(3, 3), (1, 1)])
+
+    def test_negative_limit_is_clamped(self):
+        self.assertEqual(self.get_recipe_counts(-1), [(0, 3), (0, 1)])
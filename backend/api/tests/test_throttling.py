@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.core import checks
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import check_throttle_cache
+from ..throttling import FixedWindowRateThrottle
+from .base import APITestCase
+
+LOCMEM_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+MEMCACHED_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'LOCATION': '127.0.0.1:11211',
+}}
+DUMMY_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+}}
+
+
+class FixedWindowThrottleTests(APITestCase):
+    """Один счетчик на окно: лимит, заголовки квоты и сброс окна."""
+
+    def setUp(self):
+        super().setUp()
+        self.now = 6000.0
+        for patcher in (
+            mock.patch.object(
+                FixedWindowRateThrottle, 'THROTTLE_RATES',
+                {'user': '3/min', 'anon': '2/min'}
+            ),
+            mock.patch.object(
+                FixedWindowRateThrottle, 'timer', lambda throttle: self.now
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, client):
+        return client.get('/api/tags/')
+
+    def test_user_is_limited_within_window(self):
+        for remaining in (2, 1, 0):
+            response = self.get(self.reader_client)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-RateLimit-Limit'], '3')
+            self.assertEqual(
+                response['X-RateLimit-Remaining'], str(remaining)
+            )
+            self.assertEqual(response['X-RateLimit-Reset'], '60')
+        self.now += 15
+        response = self.get(self.reader_client)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '45')
+
+    def test_next_window_starts_from_zero(self):
+        for _ in range(4):
+            self.get(self.reader_client)
+        self.now += 60
+        response = self.get(self.reader_client)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-RateLimit-Remaining'], '2')
+
+    def test_counters_are_per_client(self):
+        for _ in range(4):
+            self.get(self.reader_client)
+        self.assertEqual(self.get(self.author_client).status_code, 200)
+        self.assertEqual(self.get(self.anon_client).status_code, 200)
+        self.assertEqual(self.get(self.anon_client).status_code, 200)
+        self.assertEqual(self.get(self.anon_client).status_code, 429)
+
+
+class ThrottleCacheCheckTests(SimpleTestCase):
+    """api.E001 для кэша троттлинга без общего атомарного incr."""
+
+    def get_ids(self):
+        return [message.id for message in check_throttle_cache(None)]
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_process_local_cache_is_an_error(self):
+        self.assertEqual(self.get_ids(), ['api.E001'])
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_error_is_reported_only_for_deploy(self):
+        ids = [message.id for message in checks.run_checks()]
+        self.assertNotIn('api.E001', ids)
+        ids = [
+            message.id
+            for message in checks.run_checks(include_deployment_checks=True)
+        ]
+        self.assertIn('api.E001', ids)
+
+    @override_settings(CACHES=MEMCACHED_CACHES)
+    def test_memcached_passes(self):
+        self.assertEqual(self.get_ids(), [])
+
+    @override_settings(CACHES=DUMMY_CACHES)
+    def test_dummy_cache_is_an_explicit_opt_out(self):
+        self.assertEqual(self.get_ids(), [])
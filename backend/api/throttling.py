@@ -0,0 +1,64 @@
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import throttling
+
+from .metrics import THROTTLED_REQUESTS
+
+
+class FixedWindowRateThrottle(throttling.SimpleRateThrottle):
+    """Ограничение частоты по фиксированным окнам.
+
+    Вместо списка отметок времени в кэше лежит один счетчик на окно,
+    который увеличивается одним атомарным incr. THROTTLE_CACHE_ALIAS
+    должен указывать на общий кэш с атомарным incr на сервере
+    (memcached, redis), иначе лимит умножается на число воркеров.
+    Другой кэш отклоняет проверка api.E001 в manage.py check --deploy.
+    """
+
+    def get_cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def increment(self, key):
+        cache = self.get_cache()
+        try:
+            return cache.incr(key)
+        except ValueError:
+            if cache.add(key, 1, self.duration + 1):
+                return 1
+            return cache.incr(key)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.reset = (window + 1) * self.duration
+        count = self.increment(f'{self.key}:{window}')
+        remaining = max(self.num_requests - count, 0)
+        quota = getattr(request._request, 'rate_limit', None)
+        if quota is None or remaining < quota['remaining']:
+            request._request.rate_limit = {
+                'limit': self.num_requests,
+                'remaining': remaining,
+                'reset': math.ceil(self.reset - self.now),
+            }
+        if count > self.num_requests:
+            THROTTLED_REQUESTS.labels(self.scope).inc()
+            return False
+        return True
+
+    def wait(self):
+        return self.reset - self.now
+
+
+class UserRateThrottle(FixedWindowRateThrottle, throttling.UserRateThrottle):
+    pass
+
+
+class AnonRateThrottle(FixedWindowRateThrottle, throttling.AnonRateThrottle):
+    pass
@@ -2,7 +2,8 @@ from django.urls import include, path
 from django.views.generic import TemplateView
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
+from .views import (CustomUserViewSet, IngredientViewSet, MetricsAPIView,
+                    RecipeViewSet, SubscriptionBulkAPIView,
                     SubscriptionCreateDeleteAPIView, SubscriptionViewSet,
                     TagViewSet)
 
@@ -20,10 +21,15 @@ urlpatterns = [
         TemplateView.as_view(template_name='redoc.html'),
         name='docs'
     ),
+    path('metrics/', MetricsAPIView.as_view(), name='metrics'),
     path(
         'users/<int:id>/subscribe/',
         SubscriptionCreateDeleteAPIView.as_view(),
         name='subscribe'),
+    path(
+        'users/subscribe/',
+        SubscriptionBulkAPIView.as_view(),
+        name='subscribe_bulk'),
     path(
         'users/subscriptions/',
         SubscriptionViewSet.as_view({'get': 'list'}),
@@ -1,19 +1,206 @@
-from django.db.models import Sum
-from django.http import HttpResponse
-from recipes.models import AddAmount
-
-
-def download_txt_ingredients(request):
-    ingredients = AddAmount.objects.filter(
-        recipe__cart__user=request.user).values(
-        'ingredients__name', 'ingredients__measurement_unit'
-    ).annotate(total=Sum('amount'))
-    shopping_cart = '\n'.join([
-        f'{ingredient["ingredients__name"]} - {ingredient["total"]} '
-        f'{ingredient["ingredients__measurement_unit"]}'
-        for ingredient in ingredients
-    ])
-    filename = 'shopping_cart.txt'
-    response = HttpResponse(shopping_cart, content_type='text/plain')
+import csv
+import os
+import tempfile
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
+from recipes.counters import update_counter
+from recipes.models import Recipe, ShoppingListItem
+from recipes.utils import delete_rows, lock_users
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.response import Response
+
+from .serializers import BulkIdsSerializer
+
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_cart_ingredients(user):
+    return ShoppingListItem.objects.filter(user=user).values(
+        'amount',
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+    ).order_by('name').iterator()
+
+
+def stream_txt(ingredients):
+    separator = ''
+    for ingredient in ingredients:
+        yield (
+            f'{separator}{ingredient["name"]} - {ingredient["amount"]} '
+            f'{ingredient["measurement_unit"]}'
+        )
+        separator = '\n'
+
+
+def stream_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(
+        ('Ингредиент', 'Количество', 'Единица измерения')
+    )
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['name'],
+            ingredient['amount'],
+            ingredient['measurement_unit'],
+        ))
+
+
+def register_pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return
+    font_path = settings.SHOPPING_CART_PDF_FONT
+    if not os.path.exists(font_path):
+        font_path = 'Vera.ttf'
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+
+
+def stream_pdf(ingredients):
+    """Собирает PDF целиком и отдает его частями.
+
+    Это не потоковая отдача: Canvas держит все страницы до save(),
+    а таблица смещений PDF известна только после последней страницы.
+    Документ копится во временном файле, первый байт уходит после
+    того, как нарисована последняя страница.
+    """
+    register_pdf_font()
+    width, height = A4
+    with tempfile.SpooledTemporaryFile(max_size=PDF_CHUNK_SIZE) as buffer:
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        y = height - PDF_MARGIN
+        pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+        for ingredient in ingredients:
+            if y < PDF_MARGIN:
+                pdf.showPage()
+                pdf.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+                y = height - PDF_MARGIN
+            pdf.drawString(
+                PDF_MARGIN, y,
+                f'{ingredient["name"]} - {ingredient["amount"]} '
+                f'{ingredient["measurement_unit"]}'
+            )
+            y -= PDF_FONT_SIZE * 1.5
+        pdf.save()
+        buffer.seek(0)
+        chunk = buffer.read(PDF_CHUNK_SIZE)
+        while chunk:
+            yield chunk
+            chunk = buffer.read(PDF_CHUNK_SIZE)
+
+
+SHOPPING_CART_STREAMS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'pdf': stream_pdf,
+}
+
+
+def download_shopping_cart_file(request):
+    renderer = request.accepted_renderer
+    ingredients = get_shopping_cart_ingredients(request.user)
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    response = StreamingHttpResponse(
+        SHOPPING_CART_STREAMS[renderer.format](ingredients),
+        content_type=content_type
+    )
+    filename = f'shopping_cart.{renderer.format}'
     response['Content-Disposition'] = f'attachment; filename={filename}'
     return response
+
+
+def get_recipes_by_author(authors, recipes_limit=None):
+    """Одним запросом выбирает рецепты авторов, не более recipes_limit
+    последних рецептов на каждого автора."""
+    recipes = Recipe.objects.filter(author__in=authors).only(
+        'id', 'name', 'image', 'image_thumbnail', 'image_card',
+        'cooking_time', 'author', 'pub_date'
+    )
+    if recipes_limit is not None:
+        ranked = recipes.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('author'),
+            order_by=(F('pub_date').desc(), F('id').desc()),
+        ))
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+            'ORDER BY pub_date DESC, id DESC',
+            (*params, recipes_limit)
+        )
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    return recipes_by_author
+
+
+def bulk_relation_response(request, model, field, targets, on_change=None):
+    """Добавляет (POST) или удаляет (DELETE) связи пользователя
+    с объектами targets по списку ids.
+
+    Связи пишутся одним INSERT с пропуском конфликтов или одним DELETE,
+    поэтому сигналы не срабатывают: счетчики обновляются здесь.
+    on_change(user, ids, created) получает id реально измененных связей.
+    Для каждого id возвращается статус: created, exists, deleted,
+    absent или not_found.
+    """
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = list(dict.fromkeys(serializer.validated_data['ids']))
+    user = request.user
+    created = request.method == 'POST'
+    with transaction.atomic():
+        # Блокировка пользователя упорядочивает его параллельные
+        # пакетные запросы, иначе статусы и списки покупок разойдутся.
+        lock_users([user.pk])
+        linked = dict(targets.filter(pk__in=ids).annotate(
+            linked=Exists(model.objects.filter(
+                user=user, **{field: OuterRef('pk')}
+            ))
+        ).values_list('pk', 'linked'))
+        changed = [
+            pk for pk, is_linked in linked.items() if is_linked != created
+        ]
+        if changed and created:
+            model.objects.bulk_create(
+                [model(user=user, **{f'{field}_id': pk}) for pk in changed],
+                ignore_conflicts=True,
+            )
+        elif changed:
+            delete_rows(model.objects.filter(
+                user=user, **{f'{field}__in': changed}
+            ))
+        if changed:
+            update_counter(model, changed, 1 if created else -1)
+            if on_change is not None:
+                on_change(user, changed, created)
+    done, skipped = ('created', 'exists') if created else ('deleted', 'absent')
+    changed = set(changed)
+    return Response([
+        {
+            'id': pk,
+            'status': (
+                'not_found' if pk not in linked
+                else done if pk in changed else skipped
+            ),
+        }
+        for pk in ids
+    ])
@@ -1,8 +1,15 @@
+from django.db import transaction
+from django.db.models import (Count, Exists, Max, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
-from rest_framework import filters, status, viewsets
+from recipes.models import (AddAmount, Favorite, Ingredient, Recipe,
+                            ShoppingCart, Tag)
+from recipes.utils import (add_to_shopping_list, lock_users,
+                           remove_from_shopping_list)
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import (SAFE_METHODS, AllowAny,
                                         IsAuthenticated,
@@ -11,20 +18,32 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from users.models import Subscription, User
 
-from .filters import IngredientSearchFilter, RecipeFilter
-from .mixins import ListRetrieveViewSet, ListViewSet
-from .pagination import FoodGramPagination
-from .permissions import IsAdminOrReadOnly, IsAuthorOnly
+from . import cache
+from .filters import IngredientSearchFilter, RecipeFilter, RecipeSearchFilter
+from .ingredient_index import ingredient_index
+from .metrics import render_metrics
+from .mixins import (AnonymousCacheMixin, ConditionalGetMixin,
+                     ListRetrieveViewSet, ListViewSet, ProjectionMixin)
+from .pagination import FoodGramPagination, RecipePagination
+from .permissions import IsAdmin, IsAdminOrReadOnly, IsAuthorOnly
+from .projections import (RecipeProjection, SubscriptionProjection,
+                          UserProjection)
+from .renderers import (CsvShoppingCartRenderer, PdfShoppingCartRenderer,
+                        TxtShoppingCartRenderer)
 from .serializers import (AccountSerializer, CustomUserSerializer,
                           FavoriteSerializer, IngredientSerializer,
                           RecipeListRetrieveSerializer,
                           RecipeManipulationSerializer, ShoppingCartSerializer,
-                          SubscriptionSerializer, TagSerializer)
-from .utils import download_txt_ingredients
+                          SubscriptionSerializer, TagSerializer,
+                          get_recipes_limit)
+from .snapshots import snapshot_response
+from .utils import (bulk_relation_response, download_shopping_cart_file,
+                    get_recipes_by_author)
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ProjectionMixin, UserViewSet):
     serializer_class = CustomUserSerializer
+    projection_class = UserProjection
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
     lookup_field = 'id'
@@ -40,6 +59,8 @@ class CustomUserViewSet(UserViewSet):
     )
     def me(self, request):
         user = request.user
+        if request.method == 'GET':
+            return Response(self.get_serializer(user).data)
         serializer = self.get_serializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -53,10 +74,39 @@ class SubscriptionViewSet(ListViewSet):
     serializer_class = SubscriptionSerializer
     permission_classes = (IsAuthorOnly,)
     pagination_class = FoodGramPagination
+    projection_class = SubscriptionProjection
     http_method_names = ('get', )
 
     def get_queryset(self):
-        return Subscription.objects.filter(user=self.request.user)
+        authors = User.objects.annotate(is_subscribed=Value(True))
+        return Subscription.objects.filter(
+            user=self.request.user
+        ).order_by('id').prefetch_related(
+            Prefetch('author', queryset=authors)
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        recipes_limit = get_recipes_limit(request)
+        if self.projection_class is not None:
+            projection = self.projection_class(request, recipes_limit)
+            rows = projection.get_rows(queryset)
+            page = self.paginate_queryset(rows)
+            data = projection.represent(rows if page is None else page)
+        else:
+            page = self.paginate_queryset(queryset)
+            subscriptions = queryset if page is None else page
+            context = self.get_serializer_context()
+            context['recipes_by_author'] = get_recipes_by_author(
+                [subscription.author_id for subscription in subscriptions],
+                recipes_limit
+            )
+            data = self.get_serializer(
+                subscriptions, many=True, context=context
+            ).data
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
 
 
 class SubscriptionCreateDeleteAPIView(APIView):
@@ -88,32 +138,157 @@ class SubscriptionCreateDeleteAPIView(APIView):
                         status=status.HTTP_400_BAD_REQUEST)
 
 
-class IngredientViewSet(ListRetrieveViewSet):
+class SubscriptionBulkAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+    http_method_names = ('post', 'delete', )
+
+    def post(self, request):
+        return bulk_relation_response(
+            request, Subscription, 'author',
+            User.objects.exclude(pk=request.user.pk)
+        )
+
+    delete = post
+
+
+class IngredientViewSet(ConditionalGetMixin, ListRetrieveViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     filterset_class = IngredientSearchFilter
     search_fields = ('^name')
+    change_versions = ('ingredient',)
 
+    def list(self, request, *args, **kwargs):
+        if not request.query_params:
+            return snapshot_response(request, 'ingredients')
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(self.search, request, name)
 
-class TagViewSet(ListRetrieveViewSet):
+    def search(self, request, name):
+        return Response(ingredient_index.search(name))
+
+
+class TagViewSet(ConditionalGetMixin, ListRetrieveViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
+    change_versions = ('tag',)
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params:
+            return snapshot_response(request, 'tags')
+        return super().list(request, *args, **kwargs)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                    ProjectionMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
+    projection_class = RecipeProjection
     permission_classes = (IsAuthenticatedOrReadOnly,)
-    pagination_class = FoodGramPagination
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter,)
+    pagination_class = RecipePagination
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter,)
     filterset_class = RecipeFilter
     filterset_fields = ('tags', 'author',
                         'is_favorited', 'is_in_shopping_cart',)
-    search_fields = ('$name', )
     http_method_names = ('get', 'post', 'patch', 'delete',)
 
+    change_versions = ('recipe', 'tag', 'ingredient', 'user',)
+    # Связи пользователя, от которых зависят флаги в ответах.
+    user_relations = (Favorite, ShoppingCart, Subscription)
+
+    def annotate_user_flags(self, queryset):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        )
+
+    def get_queryset(self):
+        user = self.request.user
+        authors = User.objects.all()
+        queryset = self.annotate_user_flags(Recipe.objects.prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredients_recipes',
+                queryset=AddAmount.objects.select_related(
+                    'ingredients'
+                ).order_by('id')
+            ),
+        ))
+        if user.is_authenticated:
+            authors = authors.annotate(is_subscribed=Exists(
+                Subscription.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        else:
+            authors = authors.annotate(is_subscribed=Value(False))
+        return queryset.prefetch_related(
+            Prefetch('author', queryset=authors)
+        )
+
+    def get_user_stamp(self):
+        """Число строк и последний id каждой связи пользователя.
+
+        Добавление дает новый id, удаление уменьшает число строк,
+        поэтому отпечаток меняется только от действий самого
+        пользователя. Один запрос с подзапросами по индексам связей.
+        """
+        user = self.request.user
+        if not user.is_authenticated:
+            return ()
+        stamps = {}
+        for number, model in enumerate(self.user_relations):
+            rows = model.objects.filter(user=OuterRef('pk')).order_by(
+            ).values('user')
+            stamps[f'count_{number}'] = Subquery(
+                rows.annotate(total=Count('id')).values('total'))
+            stamps[f'last_{number}'] = Subquery(
+                rows.annotate(last=Max('id')).values('last'))
+        return User.objects.filter(pk=user.pk).annotate(
+            **stamps
+        ).values_list(*stamps).first() or ()
+
+    def get_validators(self):
+        etag, last_modified = super().get_validators()
+        if self.request.user.is_authenticated:
+            # У отпечатка связей пользователя нет даты изменения,
+            # поэтому ему отвечают только по ETag.
+            return etag, None
+        return etag, last_modified
+
+    def get_validator_state(self):
+        user = self.request.user
+        if self.action == 'list':
+            return (user.id, *self.get_user_stamp()), None
+        pk = self.kwargs.get(self.lookup_field)
+        if not str(pk).isdigit():
+            return None
+        recipe = self.annotate_user_flags(Recipe.objects.filter(pk=pk))
+        if user.is_authenticated:
+            recipe = recipe.annotate(is_subscribed=Exists(
+                Subscription.objects.filter(
+                    user=user, author=OuterRef('author'))
+            ))
+        else:
+            recipe = recipe.annotate(is_subscribed=Value(False))
+        recipe = recipe.values_list(
+            'id', 'modified', 'is_favorited', 'is_in_shopping_cart',
+            'is_subscribed'
+        ).first()
+        if recipe is None:
+            return None
+        return (user.id, *recipe), recipe[1]
+
     def get_serializer_class(self, *args, **kwargs):
         if self.request.method in SAFE_METHODS:
             return RecipeListRetrieveSerializer
@@ -122,6 +297,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(methods=('GET',),
+            detail=False,
+            url_path='cache_stats',
+            permission_classes=(IsAdmin,))
+    def cache_stats(self, request):
+        return Response(cache.get_stats())
+
     def favorite_adding(self, request, recipe):
         data = {'user': request.user.id, 'recipe': recipe}
         serializer = FavoriteSerializer(
@@ -156,15 +338,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return self.favorite_adding(request, recipe.id)
         return self.delete_from_favorit(request, recipe.id)
 
+    @action(
+        methods=('post', 'delete',),
+        detail=False,
+        url_path='favorite',
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_bulk(self, request):
+        return bulk_relation_response(
+            request, Favorite, 'recipe', Recipe.objects.all()
+        )
+
     @action(methods=('GET',),
             detail=False,
             url_path='download_shopping_cart',
             serializer_class=ShoppingCartSerializer,
-            permission_classes=(IsAuthorOnly,))
+            permission_classes=(IsAuthorOnly,),
+            renderer_classes=(TxtShoppingCartRenderer,
+                              CsvShoppingCartRenderer,
+                              PdfShoppingCartRenderer,))
     def download_shopping_cart(self, request):
-        return download_txt_ingredients(request)
+        return download_shopping_cart_file(request)
 
+    @transaction.atomic
     def add_to_shopping_cart(self, request, recipe):
+        # Блокировка до записи в корзину: тот же порядок, что и
+        # в пакетных запросах и пересчете списков покупок.
+        lock_users([request.user.id])
         data = {'user': request.user.id, 'recipe': recipe}
         serializer = ShoppingCartSerializer(
             data=data, context={'request': request}
@@ -174,7 +374,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(serializer.data,
                         status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def delete_from_shopping_cart(self, request, recipe):
+        lock_users([request.user.id])
         cart = ShoppingCart.objects.filter(user=request.user,
                                            recipe=recipe)
         if cart.exists():
@@ -195,3 +397,37 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if request.method == 'POST':
             return self.add_to_shopping_cart(request, recipe.id)
         return self.delete_from_shopping_cart(request, recipe.id)
+
+    def update_cart_shopping_list(self, user, recipes, created):
+        if created:
+            add_to_shopping_list(user.id, *recipes)
+        else:
+            remove_from_shopping_list(user.id, *recipes)
+
+    @action(
+        methods=('post', 'delete',),
+        detail=False,
+        url_path='shopping_cart',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_bulk(self, request):
+        return bulk_relation_response(
+            request, ShoppingCart, 'recipe', Recipe.objects.all(),
+            on_change=self.update_cart_shopping_list
+        )
+
+
+class MetricsAPIView(APIView):
+    """Метрики в формате Prometheus.
+
+    Только для внутренней сети: nginx закрывает путь снаружи,
+    Prometheus ходит в web:8000 напрямую.
+    """
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    throttle_classes = ()
+    http_method_names = ('get', )
+
+    def get(self, request):
+        body, content_type = render_metrics()
+        return HttpResponse(body, content_type=content_type)
@@ -0,0 +1,19 @@
+import os
+import shutil
+
+# Воркеры пишут метрики Prometheus в общий каталог, см. api/metrics.py.
+# Переменная задается до старта воркеров, чтобы они ее унаследовали.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/foodgram-metrics'
+)
+
+
+def on_starting(server):
+    # Файлы прошлого запуска дали бы устаревшие суммы.
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
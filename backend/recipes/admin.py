@@ -1,4 +1,5 @@
 from django.contrib import admin
+from foodgram.paginators import EstimatedCountPaginator
 
 from .models import AddAmount, Favorite, Ingredient, Recipe, ShoppingCart, Tag
 
@@ -6,7 +7,6 @@ from .models import AddAmount, Favorite, Ingredient, Recipe, ShoppingCart, Tag
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit',)
-    list_filter = ('name',)
     search_fields = ('name',)
     empty_value_display = '---пусто---'
 
@@ -24,43 +24,57 @@ class TagAdmin(admin.ModelAdmin):
 class IngredientInLine(admin.TabularInline):
     model = AddAmount
     min_num = 1
+    autocomplete_fields = ('ingredients',)
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     inlines = [IngredientInLine]
-    list_display = ('id', 'name', 'author', 'text', 'in_favorites',)
-    list_filter = ('author', 'name', 'tags',)
-    search_fields = ('name', 'author', 'tags',)
+    list_display = ('id', 'name', 'author', 'text', 'in_favorites',
+                    'in_carts_count',)
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name', 'author__username',)
+    autocomplete_fields = ('author', 'tags',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '---пусто---'
 
     @staticmethod
+    @admin.display(description='В избранном', ordering='favorites_count')
     def in_favorites(obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(AddAmount)
 class IngredientRecipeAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'ingredients', 'amount',)
-    list_editable = ('ingredients', 'amount',)
-    list_filter = ('ingredients',)
-    search_fields = ('ingredient_for_recipe__name',)
+    list_display = ('pk', 'recipe', 'ingredients', 'amount',)
+    list_editable = ('amount',)
+    list_select_related = ('recipe', 'ingredients',)
+    search_fields = ('ingredients__name', 'recipe__name',)
+    autocomplete_fields = ('recipe', 'ingredients',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '---пусто---'
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'recipe',)
-    list_editable = ('user', 'recipe',)
-    list_filter = ('user', 'recipe',)
-    search_fields = ('user', 'recipe',)
+    list_select_related = ('user', 'recipe',)
+    search_fields = ('user__username', 'recipe__name',)
+    autocomplete_fields = ('user', 'recipe',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '---пусто---'
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'recipe',)
-    list_editable = ('user', 'recipe',)
-    list_filter = ('user', 'recipe',)
-    search_fields = ('user', 'recipe',)
+    list_select_related = ('user', 'recipe',)
+    search_fields = ('user__username', 'recipe__name',)
+    autocomplete_fields = ('user', 'recipe',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '---пусто---'
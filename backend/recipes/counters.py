@@ -0,0 +1,56 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from users.models import Subscription, User
+
+from .models import Favorite, Recipe, ShoppingCart
+
+# Модель-связь: (модель со счетчиком, поле связи, поле счетчика).
+COUNTERS = {
+    Favorite: (Recipe, 'recipe', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe', 'in_carts_count'),
+    Recipe: (User, 'author', 'recipes_count'),
+    Subscription: (User, 'author', 'followers_count'),
+}
+
+
+def update_counter(model, ids, delta=1):
+    """Сдвигает счетчик на delta за каждое вхождение id в ids.
+
+    Обновление идет через F(), поэтому параллельные изменения
+    не теряются, а счетчик не уходит ниже нуля.
+    """
+    target, _, field = COUNTERS[model]
+    ids_by_delta = defaultdict(list)
+    for pk, count in Counter(pk for pk in ids if pk is not None).items():
+        ids_by_delta[count * delta].append(pk)
+    for change, pks in ids_by_delta.items():
+        target.objects.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) + Value(change), Value(0))}
+        )
+
+
+def get_counted(model):
+    """Подзапрос с фактическим числом связей для OuterRef('pk')."""
+    _, link, _ = COUNTERS[model]
+    counted = model.objects.filter(**{link: OuterRef('pk')}).order_by(
+    ).values(link).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted), Value(0))
+
+
+def get_counter_drift(model):
+    """Объекты, у которых сохраненный счетчик расходится с фактом."""
+    target, _, field = COUNTERS[model]
+    return target.objects.annotate(expected=get_counted(model)).exclude(
+        **{field: F('expected')}
+    )
+
+
+def reconcile_counter(model, ids=None):
+    """Пересчитывает счетчик заново у объектов ids или у всех."""
+    target, _, field = COUNTERS[model]
+    objects = target.objects.all()
+    if ids is not None:
+        objects = objects.filter(pk__in=ids)
+    return objects.update(**{field: get_counted(model)})
@@ -0,0 +1,84 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps, features
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (600, 600),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+
+
+def get_variant_format():
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def render_variant(image, size):
+    """Уменьшает изображение и перекодирует его без EXIF."""
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    image_format, _ = get_variant_format()
+    buffer = BytesIO()
+    variant.save(buffer, image_format, quality=80, optimize=True)
+    return buffer.getvalue()
+
+
+def process_recipe_image(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    source_name = recipe.image.name
+    with recipe.image.open('rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGB')
+    _, extension = get_variant_format()
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    variants = {
+        name: render_variant(image, size)
+        for name, size in IMAGE_VARIANTS.items()
+    }
+    recipe.refresh_from_db(fields=['image'])
+    if recipe.image.name != source_name:
+        return
+    for name, data in variants.items():
+        getattr(recipe, f'image_{name}').save(
+            f'{stem}_{name}.{extension}', ContentFile(data), save=False
+        )
+    recipe.save(update_fields=[
+        *(f'image_{name}' for name in IMAGE_VARIANTS), 'modified'
+    ])
+
+
+def run_in_background(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Recipe %s image processing failed', recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_recipe_image(recipe_id):
+    """После коммита строит варианты изображения вне запроса."""
+    if settings.RECIPE_IMAGE_ASYNC:
+        transaction.on_commit(
+            lambda: executor.submit(run_in_background, recipe_id)
+        )
+    else:
+        transaction.on_commit(lambda: process_recipe_image(recipe_id))
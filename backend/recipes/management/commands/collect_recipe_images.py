@@ -0,0 +1,85 @@
+import os
+import time
+from collections import Counter
+from typing import Any, Optional
+
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+IMAGE_FIELDS = ('image', 'image_thumbnail', 'image_card')
+
+
+class Command(BaseCommand):
+    help = ('Counts references to recipe image blobs and deletes '
+            'unreferenced ones.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rehash',
+            action='store_true',
+            help='Move images with legacy names to content-addressed names.'
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=3600,
+            help='Keep unreferenced blobs younger than this many seconds.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report orphans, do not delete them.'
+        )
+
+    def get_references(self):
+        references = Counter()
+        for names in Recipe.objects.values_list(*IMAGE_FIELDS).iterator():
+            references.update(name for name in names if name)
+        return references
+
+    def walk(self, directory):
+        if not recipe_image_storage.exists(directory):
+            return
+        directories, files = recipe_image_storage.listdir(directory)
+        for file in files:
+            yield os.path.join(directory, file)
+        for child in directories:
+            yield from self.walk(os.path.join(directory, child))
+
+    def rehash(self):
+        for recipe in Recipe.objects.exclude(image='').iterator():
+            updated = []
+            for field_name in IMAGE_FIELDS:
+                field = getattr(recipe, field_name)
+                if not field or not recipe_image_storage.exists(field.name):
+                    continue
+                with recipe_image_storage.open(field.name) as file:
+                    name = recipe_image_storage.save(field.name, file)
+                if name != field.name:
+                    setattr(recipe, field_name, name)
+                    updated.append(field_name)
+            if updated:
+                recipe.save(update_fields=[*updated, 'modified'])
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        if options['rehash']:
+            self.rehash()
+        references = self.get_references()
+        now = time.time()
+        orphans = [
+            name for name in self.walk('recipes')
+            if references[name] == 0
+            and now - recipe_image_storage.get_modified_time(
+                name).timestamp() > options['grace']
+        ]
+        for name in orphans:
+            self.stdout.write(f'orphan: {name}')
+            if not options['dry_run']:
+                recipe_image_storage.force_delete(name)
+        shared = sum(1 for count in references.values() if count > 1)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(references)} referenced blobs ({shared} shared), '
+            f'{len(orphans)} orphans '
+            f'{"found" if options["dry_run"] else "deleted"}'
+        ))
@@ -0,0 +1,294 @@
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from typing import Any, Optional
+
+from api import cache
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from recipes.counters import COUNTERS, reconcile_counter
+from recipes.models import (AddAmount, ChangeVersion, Favorite, Ingredient,
+                            Recipe, ShoppingCart, Tag)
+from users.models import Subscription, User
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F2C94C', 'dessert'),
+    ('Выпечка', '#B5651D', 'baking'),
+    ('Постное', '#2D9CDB', 'lenten'),
+)
+DISHES = (
+    'суп', 'салат', 'омлет', 'пирог', 'рагу', 'плов', 'каша', 'запеканка',
+    'паста', 'котлеты', 'блины', 'сырники', 'борщ', 'жаркое', 'кекс',
+)
+ADJECTIVES = (
+    'домашний', 'быстрый', 'летний', 'зимний', 'пряный', 'легкий',
+    'бабушкин', 'сытный', 'праздничный', 'острый', 'нежный', 'постный',
+)
+WORDS = (
+    'нарезать', 'смешать', 'добавить', 'обжарить', 'варить', 'запекать',
+    'посолить', 'поперчить', 'остудить', 'подавать', 'минут', 'до',
+    'готовности', 'на', 'среднем', 'огне', 'в', 'духовке', 'с', 'зеленью',
+    'и', 'сметаной', 'крупно', 'мелко', 'тесто', 'соус', 'масло', 'сковороде',
+)
+# Доля рецептов с данным числом ингредиентов, пик на 6-8.
+INGREDIENT_COUNTS = (3, 4, 5, 6, 7, 8, 9, 10, 12, 15, 20)
+INGREDIENT_COUNT_WEIGHTS = (4, 7, 11, 14, 15, 14, 11, 9, 7, 5, 3)
+
+
+def get_skewed_weights(size, exponent):
+    """Накопленные веса закона Ципфа: i-й элемент в (i+1)^s раз реже."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def batched(objects, size):
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Generates synthetic users, recipes, favorites, carts and '
+            'subscriptions with skewed popularity for load testing.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=100000)
+        parser.add_argument('--carts', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=20000)
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help='Same seed on an empty database gives the same data.'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Zipf exponent for author and recipe popularity.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Recipes are published over this many days before today.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Prefix of generated usernames and emails.'
+        )
+        parser.add_argument(
+            '--password', default='load-password',
+            help='Password shared by all generated users.'
+        )
+
+    def insert(self, model, objects, batch_size):
+        started = time.monotonic()
+        total = 0
+        for batch in batched(objects, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    batch, batch_size=batch_size, ignore_conflicts=True
+                )
+            total += len(batch)
+        self.stdout.write(
+            f'{model._meta.db_table}: {total} rows '
+            f'in {time.monotonic() - started:.1f}s'
+        )
+
+    def pick_pairs(self, count, users, targets, weights, exclude_self=False):
+        """Уникальные пары (пользователь, цель), цели выбираются по весам.
+
+        Пар не больше половины возможных. Когда выборка по весам почти
+        вся уходит в повторы, остаток добирается равномерно: свободна
+        хотя бы половина пар, так что в среднем хватает двух попыток.
+        """
+        limit = len(users) * (len(targets) - exclude_self)
+        if count > limit // 2:
+            count = limit // 2
+            self.stderr.write(
+                f'Only {count} unique pairs can be picked, using that.')
+        seen = set()
+        attempts = 0
+        while len(seen) < count and attempts < 3 * count:
+            chunk = min(count - len(seen), 100000)
+            attempts += chunk
+            for user, target in zip(
+                self.rng.choices(users, k=chunk),
+                self.rng.choices(targets, cum_weights=weights, k=chunk)
+            ):
+                if exclude_self and user == target:
+                    continue
+                pair = (user, target)
+                if pair not in seen:
+                    seen.add(pair)
+                    yield pair
+        while len(seen) < count:
+            pair = (self.rng.choice(users), self.rng.choice(targets))
+            if pair not in seen and not (exclude_self and pair[0] == pair[1]):
+                seen.add(pair)
+                yield pair
+
+    def create_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in TAGS
+            )
+            ChangeVersion.bump('tag')
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Users with prefix "{prefix}" already exist, '
+                'pass another --prefix.'
+            )
+        password = make_password(options['password'])
+        self.insert(User, (
+            User(
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@example.com',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            )
+            for number in range(options['users'])
+        ), options['batch_size'])
+        return list(User.objects.filter(
+            username__startswith=prefix
+        ).order_by('id').values_list('id', flat=True))
+
+    def make_recipe(self, author):
+        rng = self.rng
+        return Recipe(
+            author_id=author,
+            name=f'{rng.choice(ADJECTIVES).capitalize()} '
+                 f'{rng.choice(DISHES)}',
+            text=' '.join(rng.choices(WORDS, k=rng.randint(20, 120))),
+            cooking_time=rng.randint(5, 180),
+        )
+
+    def create_recipes(self, users, options):
+        last_id = Recipe.objects.aggregate(last=Max('id'))['last'] or 0
+        authors = self.rng.choices(
+            users, cum_weights=get_skewed_weights(len(users), options['skew']),
+            k=options['recipes']
+        )
+        self.insert(
+            Recipe, (self.make_recipe(author) for author in authors),
+            options['batch_size']
+        )
+        return list(Recipe.objects.filter(
+            pk__gt=last_id
+        ).order_by('id').values_list('id', flat=True))
+
+    def spread_pub_dates(self, recipes, options):
+        """Разносит даты публикации по последним days дням.
+
+        bulk_create ставит всем рецептам одно время вставки, а лента
+        и курсорная пагинация сортируют по pub_date. Даты растут
+        вместе с id, как при обычной публикации.
+        """
+        started = time.monotonic()
+        end = datetime.combine(datetime.now().date(), datetime.min.time())
+        span = timedelta(days=options['days']).total_seconds()
+        offsets = sorted(self.rng.random() for _ in recipes)
+        objects = []
+        for recipe, offset in zip(recipes, offsets):
+            date = end - timedelta(seconds=span * (1 - offset))
+            objects.append(Recipe(id=recipe, pub_date=date, modified=date))
+        for batch in batched(objects, options['batch_size']):
+            with transaction.atomic():
+                Recipe.objects.bulk_update(batch, ('pub_date', 'modified'))
+        self.stdout.write(
+            f'{Recipe._meta.db_table}: spread pub_date over '
+            f'{options["days"]} days in {time.monotonic() - started:.1f}s'
+        )
+
+    def make_amounts(self, recipes, ingredients, weights):
+        rng = self.rng
+        for recipe in recipes:
+            size = rng.choices(
+                INGREDIENT_COUNTS, weights=INGREDIENT_COUNT_WEIGHTS
+            )[0]
+            chosen = set()
+            while len(chosen) < min(size, len(ingredients)):
+                chosen.add(rng.choices(ingredients, cum_weights=weights)[0])
+            for ingredient in sorted(chosen):
+                yield AddAmount(
+                    recipe_id=recipe, ingredients_id=ingredient,
+                    amount=rng.choice((1, 2, 3, 5, 10, 50, 100, 200, 500))
+                )
+
+    def make_recipe_tags(self, recipes, tags):
+        through = Recipe.tags.through
+        for recipe in recipes:
+            count = self.rng.randint(1, min(3, len(tags)))
+            for tag in self.rng.sample(tags, count):
+                yield through(recipe_id=recipe, tag_id=tag)
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        self.rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        ingredients = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        if not ingredients:
+            raise CommandError('No ingredients, run load_data first.')
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Need at least 2 users and 1 recipe.')
+        started = time.monotonic()
+        tags = self.create_tags()
+        users = self.create_users(options)
+        recipes = self.create_recipes(users, options)
+        self.spread_pub_dates(recipes, options)
+        self.insert(AddAmount, self.make_amounts(
+            recipes, ingredients,
+            get_skewed_weights(len(ingredients), options['skew'])
+        ), batch_size)
+        self.insert(
+            Recipe.tags.through, self.make_recipe_tags(recipes, tags),
+            batch_size
+        )
+        popularity = get_skewed_weights(len(recipes), options['skew'])
+        self.insert(Favorite, (
+            Favorite(user_id=user, recipe_id=recipe)
+            for user, recipe in self.pick_pairs(
+                options['favorites'], users, recipes, popularity
+            )
+        ), batch_size)
+        self.insert(ShoppingCart, (
+            ShoppingCart(user_id=user, recipe_id=recipe)
+            for user, recipe in self.pick_pairs(
+                options['carts'], users, recipes, popularity
+            )
+        ), batch_size)
+        self.insert(Subscription, (
+            Subscription(user_id=user, author_id=author)
+            for user, author in self.pick_pairs(
+                options['subscriptions'], users, users,
+                get_skewed_weights(len(users), options['skew']),
+                exclude_self=True
+            )
+        ), batch_size)
+        # bulk_create не шлет сигналы: счетчики, списки покупок,
+        # версии и кэш ответов обновляются здесь одним проходом.
+        for model in COUNTERS:
+            reconcile_counter(model)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        for name in ('user', 'recipe'):
+            ChangeVersion.bump(name)
+        cache.bump_generations('list', 'user')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated load data in {time.monotonic() - started:.1f}s'
+        ))
@@ -2,7 +2,7 @@ import csv
 from typing import Any, Optional
 
 from django.core.management.base import BaseCommand
-from recipes.models import Ingredient
+from recipes.models import ChangeVersion, Ingredient
 
 
 class Command(BaseCommand):
@@ -20,6 +20,7 @@ class Command(BaseCommand):
                 measurement_unit=_['measurement_unit']
             ) for _ in reader)
             Ingredient.objects.bulk_create(to_db)
+            ChangeVersion.bump('ingredient')
             self.stdout.write(
                 self.style.SUCCESS(
                     'Data is successfully loaded'))
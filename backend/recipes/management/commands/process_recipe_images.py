@@ -0,0 +1,27 @@
+from typing import Any, Optional
+
+from django.core.management.base import BaseCommand
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Builds resized image variants for recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild variants for every recipe, not only missing ones.'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_card='')
+        processed = 0
+        for recipe_id in recipes.values_list('id', flat=True).iterator():
+            process_recipe_image(recipe_id)
+            processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed {processed} recipe images'))
@@ -0,0 +1,45 @@
+from typing import Any, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import ShoppingListItem
+from recipes.utils import get_expected_shopping_lists, rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds and verifies the per-user shopping list totals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare stored totals with the carts, do not rebuild.'
+        )
+
+    def get_drift(self):
+        expected = get_expected_shopping_lists()
+        stored = {
+            (user, ingredient): amount
+            for user, ingredient, amount
+            in ShoppingListItem.objects.values_list(
+                'user', 'ingredient', 'amount'
+            )
+        }
+        return {
+            key: (stored.get(key), expected.get(key))
+            for key in expected.keys() | stored.keys()
+            if stored.get(key) != expected.get(key)
+        }
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        if not options['check']:
+            rebuild_shopping_lists()
+        drift = self.get_drift()
+        for (user, ingredient), (stored, expected) in drift.items():
+            self.stdout.write(
+                f'user={user} ingredient={ingredient}: '
+                f'stored={stored} expected={expected}'
+            )
+        if drift:
+            raise CommandError(f'{len(drift)} shopping list rows differ.')
+        self.stdout.write(
+            self.style.SUCCESS('Shopping lists are consistent'))
@@ -0,0 +1,38 @@
+from typing import Any, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.counters import COUNTERS, get_counter_drift, reconcile_counter
+
+
+class Command(BaseCommand):
+    help = ('Recounts the denormalized favorite, cart, recipe and '
+            'follower counters.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report counters that differ, do not repair them.'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        drifted = 0
+        for model, (target, _, field) in COUNTERS.items():
+            drift = list(get_counter_drift(model).values_list(
+                'pk', field, 'expected'
+            ))
+            for pk, stored, expected in drift:
+                self.stdout.write(
+                    f'{target._meta.model_name}={pk} {field}: '
+                    f'stored={stored} expected={expected}'
+                )
+            if drift and not options['check']:
+                reconcile_counter(model, [pk for pk, _, _ in drift])
+            drifted += len(drift)
+        if drifted and options['check']:
+            raise CommandError(f'{drifted} counters differ.')
+        if drifted:
+            self.stdout.write(
+                self.style.SUCCESS(f'Repaired {drifted} counters'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Counters are consistent'))
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+POSTGRESQL_FORWARD = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('russian'::regconfig, coalesce(name, '')), 'A') "
+    "|| setweight(to_tsvector('russian'::regconfig, coalesce(text, '')), 'B')"
+    ") STORED",
+    'CREATE INDEX recipes_recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+    'CREATE INDEX recipes_recipe_name_trgm_idx '
+    'ON recipes_recipe USING gin (name gin_trgm_ops)',
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS recipes_recipe_name_trgm_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+SQLITE_FORWARD = (
+    'CREATE VIRTUAL TABLE recipes_recipe_search '
+    "USING fts5(name, text, tokenize='unicode61')",
+    'INSERT INTO recipes_recipe_search(rowid, name, text) '
+    'SELECT id, name, text FROM recipes_recipe',
+    'CREATE TRIGGER recipes_recipe_search_insert '
+    'AFTER INSERT ON recipes_recipe BEGIN '
+    'INSERT INTO recipes_recipe_search(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    'CREATE TRIGGER recipes_recipe_search_update '
+    'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+    'UPDATE recipes_recipe_search SET name = new.name, text = new.text '
+    'WHERE rowid = old.id; END',
+    'CREATE TRIGGER recipes_recipe_search_delete '
+    'AFTER DELETE ON recipes_recipe BEGIN '
+    'DELETE FROM recipes_recipe_search WHERE rowid = old.id; END',
+)
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_insert',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_update',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_delete',
+    'DROP TABLE IF EXISTS recipes_recipe_search',
+)
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({'postgresql': POSTGRESQL_FORWARD,
+                            'sqlite': SQLITE_FORWARD}),
+            run_statements({'postgresql': POSTGRESQL_BACKWARD,
+                            'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1 on 2026-10-18 18:10
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.storage.ContentAddressedStorage(), upload_to='recipes/', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image_card',
+            field=models.ImageField(blank=True, editable=False, storage=recipes.storage.ContentAddressedStorage(), upload_to='recipes/variants/', verbose_name='Изображение для карточки'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, storage=recipes.storage.ContentAddressedStorage(), upload_to='recipes/variants/', verbose_name='Миниатюра'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.urls import reverse
+from django.utils import timezone
 
+from .storage import recipe_image_storage
 from .validators import validate_not_empty
 from users.models import User
 
@@ -86,7 +89,22 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         'Изображение',
-        upload_to='recipes/'
+        upload_to='recipes/',
+        storage=recipe_image_storage
+    )
+    image_thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='recipes/variants/',
+        storage=recipe_image_storage,
+        blank=True,
+        editable=False
+    )
+    image_card = models.ImageField(
+        'Изображение для карточки',
+        upload_to='recipes/variants/',
+        storage=recipe_image_storage,
+        blank=True,
+        editable=False
     )
     text = models.TextField(
         verbose_name='Описание рецепта',
@@ -116,11 +134,33 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    modified = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False
+    )
 
     class Meta:
-        ordering = ['-pub_date', ]
+        ordering = ['-pub_date', '-id', ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id',),
+                name='recipe_pub_date_id_idx'),
+            models.Index(
+                fields=('-favorites_count', '-id',),
+                name='recipe_favorites_count_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -204,3 +244,85 @@ class ShoppingCart(models.Model):
                 fields=['user', 'recipe'], name='unique_cart'
             )
         ]
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='in_shopping_lists',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(
+        verbose_name='Общее количество',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+        db_table = 'shopping_list'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'], name='unique_shopping_list'
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.ingredient} - {self.amount}'
+
+
+class ChangeVersion(models.Model):
+    """Счетчик изменений таблицы для валидаторов ETag/Last-Modified."""
+    name = models.CharField(
+        verbose_name='Таблица',
+        max_length=50,
+        unique=True
+    )
+    version = models.PositiveBigIntegerField(
+        verbose_name='Версия',
+        default=1
+    )
+    modified = models.DateTimeField(
+        verbose_name='Дата изменения',
+        default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'Версия таблицы'
+        verbose_name_plural = 'Версии таблиц'
+        db_table = 'change_version'
+
+    def __str__(self) -> str:
+        return f'{self.name} - {self.version}'
+
+    @classmethod
+    def bump(cls, name):
+        updated = cls.objects.filter(name=name).update(
+            version=F('version') + 1,
+            modified=timezone.now()
+        )
+        if not updated:
+            cls.objects.get_or_create(name=name)
+
+    @classmethod
+    def bump_on_commit(cls, name):
+        """Сдвигает версию после коммита текущей транзакции.
+
+        Строка версии одна на таблицу: UPDATE внутри транзакции держал бы
+        ее блокировку до коммита и выстраивал всех пишущих в очередь.
+        """
+        transaction.on_commit(lambda: cls.bump(name))
+
+    @classmethod
+    def get_version(cls, name):
+        """Текущая версия таблицы, 0 - если ее еще не меняли."""
+        return cls.objects.filter(name=name).values_list(
+            'version', flat=True
+        ).first() or 0
@@ -0,0 +1,59 @@
+"""Поддержка FTS5-индекса рецептов на SQLite.
+
+Таблицу и триггеры создает миграция 0003. Схемный редактор SQLite
+пересоздает recipes_recipe почти при любом AddField/AddIndex и при этом
+теряет триггеры, поэтому после каждого migrate они восстанавливаются,
+а индекс заполняется заново.
+"""
+
+SQLITE_TRIGGERS = {
+    'recipes_recipe_search_insert': (
+        'CREATE TRIGGER recipes_recipe_search_insert '
+        'AFTER INSERT ON recipes_recipe BEGIN '
+        'INSERT INTO recipes_recipe_search(rowid, name, text) '
+        'VALUES (new.id, new.name, new.text); END'
+    ),
+    'recipes_recipe_search_update': (
+        'CREATE TRIGGER recipes_recipe_search_update '
+        'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+        'UPDATE recipes_recipe_search SET name = new.name, text = new.text '
+        'WHERE rowid = old.id; END'
+    ),
+    'recipes_recipe_search_delete': (
+        'CREATE TRIGGER recipes_recipe_search_delete '
+        'AFTER DELETE ON recipes_recipe BEGIN '
+        'DELETE FROM recipes_recipe_search WHERE rowid = old.id; END'
+    ),
+}
+
+
+def ensure_sqlite_search_index(using, **kwargs):
+    from django.db import connections
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT name FROM sqlite_master '
+            "WHERE type IN ('table', 'trigger') AND name IN (%s)" % ', '.join(
+                ['%s'] * (len(SQLITE_TRIGGERS) + 1)
+            ),
+            ['recipes_recipe_search', *SQLITE_TRIGGERS]
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if 'recipes_recipe_search' not in existing:
+            return
+        missing = [
+            sql for name, sql in SQLITE_TRIGGERS.items()
+            if name not in existing
+        ]
+        if not missing:
+            return
+        for sql in missing:
+            cursor.execute(sql)
+        cursor.execute('DELETE FROM recipes_recipe_search')
+        cursor.execute(
+            'INSERT INTO recipes_recipe_search(rowid, name, text) '
+            'SELECT id, name, text FROM recipes_recipe'
+        )
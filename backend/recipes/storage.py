@@ -0,0 +1,54 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, где имя файла - sha256 его содержимого.
+
+    Одинаковые файлы хранятся один раз: если такой блоб уже есть,
+    запись пропускается. Блобы, на которые не ссылается ни один рецепт,
+    удаляет команда collect_recipe_images.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        if os.path.basename(directory) == digest[:2]:
+            directory = os.path.dirname(directory)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        # У найденного блоба обновляется mtime: сборщик с --grace не
+        # тронет его, пока ссылка на него еще не закоммичена.
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super().save(name, content, max_length=max_length)
+        return name
+
+    def delete(self, name):
+        """Блоб может быть общим, поэтому удаляет только сборщик мусора."""
+
+    def force_delete(self, name):
+        super().delete(name)
+
+
+recipe_image_storage = ContentAddressedStorage()
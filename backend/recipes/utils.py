@@ -0,0 +1,188 @@
+from collections import Counter
+from threading import local
+
+from django.db import connections, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from users.models import User
+
+from .models import AddAmount, ShoppingCart, ShoppingListItem
+
+_pending = local()
+
+
+def lock_users(users):
+    """Блокирует строки пользователей до конца транзакции.
+
+    Списки покупок меняются только под этой блокировкой, взятой
+    в порядке id, поэтому изменения списка одного пользователя идут
+    по очереди и не ловят IntegrityError на unique_shopping_list.
+    """
+    list(User.objects.select_for_update().filter(pk__in=users).order_by(
+        'pk'
+    ).values_list('pk', flat=True))
+
+
+def get_recipe_amounts(*recipes):
+    """Суммарное количество ингредиентов рецептов: {ingredient_id: amount}."""
+    return dict(
+        AddAmount.objects.filter(recipe__in=recipes).values(
+            'ingredients'
+        ).annotate(total=Sum('amount')).values_list('ingredients', 'total')
+    )
+
+
+def get_expected_shopping_lists(users=None):
+    """Итоги списков покупок users (или всех), посчитанные по корзинам."""
+    # Условия на корзину в одном filter(), иначе второй JOIN
+    # размножит строки и суммы.
+    carts = {'recipe__cart__isnull': False}
+    if users is not None:
+        carts['recipe__cart__user__in'] = users
+    amounts = AddAmount.objects.filter(ingredients__isnull=False, **carts)
+    return {
+        (row['recipe__cart__user'], row['ingredients']): row['total']
+        for row in amounts.values(
+            'recipe__cart__user', 'ingredients'
+        ).annotate(total=Sum('amount'))
+    }
+
+
+def rebuild_shopping_lists(users=None):
+    """Пересчитывает списки покупок users (или всех) заново по корзинам."""
+    items = ShoppingListItem.objects.all()
+    if users is not None:
+        users = list(users)
+        items = items.filter(user__in=users)
+    with transaction.atomic():
+        if users is not None:
+            lock_users(users)
+        items.delete()
+        ShoppingListItem.objects.bulk_create(
+            (ShoppingListItem(user_id=user, ingredient_id=ingredient,
+                              amount=amount)
+             for (user, ingredient), amount
+             in get_expected_shopping_lists(users).items()),
+            batch_size=1000
+        )
+
+
+class RecipeShoppingListsRebuild:
+    """Пересчет списков покупок по рецептам, отложенный до коммита."""
+
+    def __init__(self):
+        self.recipes = set()
+
+    def __call__(self):
+        users = set(ShoppingCart.objects.filter(
+            recipe__in=self.recipes
+        ).values_list('user', flat=True))
+        if users:
+            rebuild_shopping_lists(users)
+
+
+def rebuild_recipe_shopping_lists(recipe_id, using=None):
+    """После коммита пересчитывает списки тех, у кого рецепт в корзине.
+
+    Все рецепты одной транзакции собираются в один пересчет, так что
+    правка или каскадное удаление состава стоит одного пересчета, а не
+    запроса на каждую строку. Пересчет идемпотентен, поэтому порядок
+    сигналов при каскадном удалении не важен.
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        rebuild = RecipeShoppingListsRebuild()
+        rebuild.recipes.add(recipe_id)
+        rebuild()
+        return
+    rebuilds = _pending.__dict__.setdefault('rebuilds', {})
+    rebuild = rebuilds.get(connection.alias)
+    # После отката Django выбрасывает колбэки транзакции, тогда
+    # заводится новый пересчет.
+    if rebuild is None or not any(
+        entry[1] is rebuild for entry in connection.run_on_commit
+    ):
+        rebuild = rebuilds[connection.alias] = RecipeShoppingListsRebuild()
+        transaction.on_commit(rebuild, using)
+    rebuild.recipes.add(recipe_id)
+
+
+def apply_shopping_list_delta(users, deltas):
+    """Прибавляет deltas {ingredient_id: amount} к спискам покупок users.
+
+    Под блокировкой пользователей недостающие строки вставляются
+    с нулем, затем один UPDATE прибавляет дельты, а строки, в которых
+    количество стало нулевым, удаляются.
+    """
+    deltas = {
+        ingredient: delta for ingredient, delta in deltas.items()
+        if ingredient is not None and delta
+    }
+    users = list(users)
+    if not users or not deltas:
+        return
+    with transaction.atomic(savepoint=False):
+        lock_users(users)
+        ShoppingListItem.objects.bulk_create(
+            (ShoppingListItem(user_id=user, ingredient_id=ingredient)
+             for user in users
+             for ingredient, delta in deltas.items() if delta > 0),
+            ignore_conflicts=True,
+        )
+        items = ShoppingListItem.objects.filter(
+            user__in=users, ingredient__in=deltas
+        )
+        items.update(amount=F('amount') + Case(
+            *(When(ingredient=ingredient, then=Value(delta))
+              for ingredient, delta in deltas.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        if any(delta < 0 for delta in deltas.values()):
+            delete_rows(items.filter(amount__lte=0))
+
+
+def add_to_shopping_list(user, *recipes):
+    apply_shopping_list_delta([user], get_recipe_amounts(*recipes))
+
+
+def remove_from_shopping_list(user, *recipes):
+    amounts = get_recipe_amounts(*recipes)
+    apply_shopping_list_delta(
+        [user],
+        {ingredient: -amount for ingredient, amount in amounts.items()}
+    )
+
+
+def delete_rows(queryset):
+    """Удаляет строки одним DELETE ... WHERE pk IN (SELECT ...).
+
+    В отличие от QuerySet.delete() строки не выбираются в память,
+    сигналы pre_delete/post_delete не шлются и каскад не собирается,
+    поэтому годится только для таблиц-связей, на которые никто не
+    ссылается. Счетчики, списки покупок, версии и поколения кэша
+    вызывающий обновляет сам.
+    """
+    meta = queryset.model._meta
+    connection = connections[queryset.db]
+    select, params = queryset.order_by().values('pk').query.get_compiler(
+        queryset.db
+    ).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(meta.db_table)} '
+            f'WHERE {connection.ops.quote_name(meta.pk.column)} '
+            f'IN ({select})',
+            params
+        )
+        return cursor.rowcount
+
+
+def update_shopping_lists(recipe, old_amounts, new_amounts):
+    """Переносит изменение состава рецепта в списки покупок
+    всех пользователей, у которых он в корзине."""
+    deltas = Counter(new_amounts)
+    deltas.subtract(old_amounts)
+    users = ShoppingCart.objects.filter(recipe=recipe).values_list(
+        'user', flat=True
+    )
+    apply_shopping_list_delta(users, deltas)
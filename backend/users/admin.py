@@ -1,4 +1,5 @@
 from django.contrib import admin
+from foodgram.paginators import EstimatedCountPaginator
 
 from .models import Subscription, User
 
@@ -11,15 +12,21 @@ class UserAdmin(admin.ModelAdmin):
         'email',
         'role',
         'first_name',
-        'last_name'
+        'last_name',
+        'recipes_count',
+        'followers_count',
     )
     search_fields = ('username', 'email',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'author',)
-    list_editable = ('author',)
-    list_filter = ('user', 'author',)
-    search_fields = ('user', 'author',)
+    list_select_related = ('user', 'author',)
+    search_fields = ('user__username', 'author__username',)
+    autocomplete_fields = ('user', 'author',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '---пусто---'
@@ -0,0 +1,40 @@
+# Generated by Django 4.1 on 2026-10-18 18:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    for model, field in (
+        (apps.get_model('recipes', 'Recipe'), 'recipes_count'),
+        (apps.get_model('users', 'Subscription'), 'followers_count'),
+    ):
+        counted = model.objects.filter(author=OuterRef('pk')).order_by(
+        ).values('author').annotate(total=Count('pk')).values('total')
+        User.objects.update(
+            **{field: Coalesce(Subquery(counted), Value(0))}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецептов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]